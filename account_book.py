@@ -1,29 +1,42 @@
+import time
+
+# 启动计时起点（首帧耗时报告从这里算起）
+STARTUP_STARTED = time.perf_counter()
+
 import kivy
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.uix.textinput import TextInput
 from kivy.uix.button import Button
-from kivy.uix.scrollview import ScrollView
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.spinner import Spinner
 from kivy.core.window import Window
 from kivy.core.text import LabelBase, DEFAULT_FONT
 from kivy.config import Config
-from kivy.graphics import Color, Rectangle, RoundedRectangle, Line
+from kivy.graphics import Color, Rectangle, RoundedRectangle, Line, InstructionGroup
 from kivy.uix.tabbedpanel import TabbedPanel, TabbedPanelItem
 from kivy.uix.floatlayout import FloatLayout
-from kivy.uix.popup import Popup
-from kivy.graphics import Triangle
-from kivy.uix.filechooser import FileChooserIconView
+from kivy.uix.widget import Widget
+from kivy.graphics import Mesh, Fbo, ClearColor, ClearBuffers
 from kivy.clock import Clock
+from kivy.properties import ObjectProperty
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 import math
 import json
 import os
 import sys
+import queue
+import functools
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from typing import List, Dict
-from collections import defaultdict
+from collections import defaultdict, deque, OrderedDict
+from collections.abc import Mapping
 
 # 定义颜色常量
 PRIMARY_COLOR = (0.2, 0.6, 0.9, 1)  # 主色调 - 蓝色
@@ -48,56 +61,13 @@ os.environ['KIVY_TEXT'] = 'utf8'
 Config.set('kivy', 'default_encoding', 'utf-8')
 
 
-# 2. 注册中文字体（自动适配Windows/Linux/安卓）
-def register_chinese_font():
-    """注册中文字体（优先本地simhei.ttf，兼容Windows/Linux/安卓）"""
-    # 1. 优先读取代码目录下的simhei.ttf（关键！适配打包场景）
-    local_font = "simhei.ttf"
-    if os.path.exists(local_font):
-        LabelBase.register(DEFAULT_FONT, local_font)
-        print(f"[表情] 成功加载本地中文字体：{local_font}")
-        return
-
-    # 2. 备用：读取系统字体（仅本地运行时生效）
-    # Windows系统默认中文字体路径
-    windows_fonts = [
-        "C:/Windows/Fonts/simhei.ttf",  # 黑体
-        "C:/Windows/Fonts/simsun.ttc",  # 宋体
-        "C:/Windows/Fonts/msyh.ttc"  # 微软雅黑
-    ]
-    # Linux/WSL系统中文字体路径
-    linux_fonts = [
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf"
-    ]
-
-    # 优先选择系统中存在的字体
-    font_path = None
-    if sys.platform == 'win32':
-        for font in windows_fonts:
-            if os.path.exists(font):
-                font_path = font
-                break
-    else:
-        for font in linux_fonts:
-            if os.path.exists(font):
-                font_path = font
-                break
-
-    # 注册字体
-    if font_path:
-        LabelBase.register(DEFAULT_FONT, font_path)
-        print(f"[表情] 成功加载系统中文字体：{font_path}")
-    else:
-        print("[表情] 未找到中文字体，仍可能出现乱码，但已启用UTF-8编码")
-
-
-# 执行字体注册
-register_chinese_font()
+# 2. 中文字体在应用构建界面时才注册（见 register_chinese_font），解析结果缓存在设置目录
 
 # ======== 适配修改：指定兼容的Kivy版本 ========
 kivy.require('2.1.0')  # 改为2.1.0（和打包时安装的版本一致）
-Window.softinput_mode = "below_target"
+# 无显示环境（如 benchmarks 基准测试）下没有窗口，Window 为 None
+if Window is not None:
+    Window.softinput_mode = "below_target"
 
 
 # ======== 核心适配：安卓数据存储路径（关键修改） ========
@@ -123,26 +93,2167 @@ TIME_FILTER_TYPES = ["今日", "本月", "本年", "自定义日期", "按月统
 EXPENSE_CATEGORIES_WITH_TOTAL = EXPENSE_CATEGORIES + ["总和"]
 
 
+# 2. 注册中文字体（自动适配Windows/Linux/安卓）
+# 候选字体：优先代码目录下的simhei.ttf（关键！适配打包场景），其次是系统字体（仅本地运行时生效）
+LOCAL_FONT = "simhei.ttf"
+WINDOWS_FONTS = [
+    "C:/Windows/Fonts/simhei.ttf",  # 黑体
+    "C:/Windows/Fonts/simsun.ttc",  # 宋体
+    "C:/Windows/Fonts/msyh.ttc"  # 微软雅黑
+]
+LINUX_FONTS = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf"
+]
+
+_font_registered = False
+
+
+def get_font_cache_path():
+    """字体路径缓存文件，与背景设置放在同一目录"""
+    return os.path.join(os.path.dirname(DATA_FILE), "font_setting.json")
+
+
+def _probe_system_font():
+    """依次检查系统候选字体，返回第一个存在的路径"""
+    for font in (WINDOWS_FONTS if sys.platform == 'win32' else LINUX_FONTS):
+        if os.path.exists(font):
+            return font
+    return None
+
+
+def resolve_chinese_font():
+    """返回要使用的中文字体路径：代码目录下的simhei.ttf始终优先；
+    只有找不到它时才使用系统字体，系统字体的探测结果缓存起来，缓存失效时才重新探测"""
+    if os.path.exists(LOCAL_FONT):
+        return LOCAL_FONT
+
+    cache_file = get_font_cache_path()
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached_path = json.load(f).get("font_path")
+        if cached_path and os.path.exists(cached_path):
+            return cached_path
+    except (OSError, ValueError):
+        pass
+
+    font_path = _probe_system_font()
+    if font_path:
+        try:
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump({"font_path": font_path}, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"保存字体缓存失败: {e}")
+    return font_path
+
+
+def register_chinese_font():
+    """注册中文字体（只执行一次，在创建第一个文字控件之前调用）"""
+    global _font_registered
+    if _font_registered:
+        return
+    _font_registered = True
+
+    font_path = resolve_chinese_font()
+    if font_path:
+        LabelBase.register(DEFAULT_FONT, font_path)
+        print(f"[表情] 成功加载中文字体：{font_path}")
+    else:
+        print("[表情] 未找到中文字体，仍可能出现乱码，但已启用UTF-8编码")
+
+
+# 追加式日志文件：每次保存/删除只追加一行 JSON，不再重写整个数据文件
+# 原 DATA_FILE 作为快照，日志超过该大小后在下次加载时合并进快照
+JOURNAL_COMPACT_BYTES = 256 * 1024
+
+# 存储引擎："json"（快照 + 追加日志）、"sqlite"（带索引的数据库）或 "sharded"（按月分片的 JSON 文件）
+# 切换为 "sqlite"/"sharded" 后首次启动会自动把 advanced_account_records.json 迁移过去
+STORAGE_ENGINE = "json"
+
+
+# ==================== 金额（整数分） ====================
+# 记录、汇总表、统计结果中的金额一律以整数“分”保存和累加，结果精确，显示时再格式化为元
+def to_cents(amount) -> int:
+    """把元（数字或字符串）转换为整数分，按四舍五入保留到分；两位小数的旧金额转换无损"""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def parse_amount(text: str):
+    """把输入框中的金额（元）解析为整数分；不是大于0的金额（如 "."、"1.2.3"、"0.001"）时返回 None"""
+    try:
+        cents = to_cents(text)
+    except (InvalidOperation, ValueError):
+        return None
+    return cents if cents > 0 else None
+
+
+def cents_to_yuan(cents: int) -> float:
+    """整数分转换为元（只用于比例、绘图等不要求精确的场合）"""
+    return cents / 100
+
+
+def format_money(cents: int) -> str:
+    """把整数分格式化为显示用的金额（保留两位小数，如 1250 -> "12.50"）"""
+    sign = "-" if cents < 0 else ""
+    yuan, fen = divmod(abs(int(cents)), 100)
+    return f"{sign}{yuan}.{fen:02d}"
+
+
+# ==================== 性能埋点 ====================
+# 打开后记录热点函数的耗时和调用次数，屏幕左上角显示帧时间、最近操作耗时和控件数，
+# 并定期把最近的事件写到数据目录下的 performance_trace.json；
+# 关闭时 profiled 直接返回原函数，运行时没有任何额外开销
+PROFILING_ENABLED = False
+PROFILE_TRACE_SIZE = 500  # 滚动跟踪保留的最近事件数
+PROFILE_DUMP_INTERVAL = 5  # 写跟踪文件的间隔（秒）
+PROFILE_OVERLAY_INTERVAL = 0.5  # 刷新悬浮信息的间隔（秒）
+PROFILE_OVERLAY_LINES = 8  # 悬浮信息显示的最近操作数
+
+
+def get_profile_trace_path():
+    """跟踪文件与数据文件放在同一目录（performance_trace.json）"""
+    return os.path.join(os.path.dirname(DATA_FILE), "performance_trace.json")
+
+
+class Profiler:
+    """热点函数的耗时和计数（统计在线程池中执行，记录时加锁）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.latencies = OrderedDict()  # 名称 -> 最近一次耗时（毫秒），最近调用的排在最后
+        self.trace = deque(maxlen=PROFILE_TRACE_SIZE)
+        self.frame_ms = 0.0
+        self.max_frame_ms = 0.0
+        self.widget_count = 0
+        self.root = None
+        self.overlay = None
+
+    def record(self, name: str, started: float, elapsed_ms: float):
+        """记录一次调用"""
+        with self.lock:
+            self.counters[name] += 1
+            self.latencies.pop(name, None)
+            self.latencies[name] = elapsed_ms
+            self.trace.append({
+                "name": name,
+                "thread": threading.current_thread().name,
+                "start_ms": round((started - STARTUP_STARTED) * 1000, 3),
+                "ms": round(elapsed_ms, 3)
+            })
+
+    def count(self, name: str, n: int = 1):
+        """累加计数器"""
+        with self.lock:
+            self.counters[name] += n
+
+    def snapshot(self) -> Dict:
+        """当前的计数、最近耗时和跟踪事件"""
+        with self.lock:
+            return {
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "frame_ms": round(self.frame_ms, 3),
+                "max_frame_ms": round(self.max_frame_ms, 3),
+                "widgets": self.widget_count,
+                "counters": dict(self.counters),
+                "latencies_ms": {name: round(ms, 3) for name, ms in self.latencies.items()},
+                "trace": list(self.trace)
+            }
+
+    def dump_trace(self, *args) -> bool:
+        """把最近的事件写到跟踪文件（先写临时文件再原子替换）"""
+        try:
+            trace_file = get_profile_trace_path()
+            tmp_file = trace_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, ensure_ascii=False)
+            os.replace(tmp_file, trace_file)
+            return True
+        except Exception as e:
+            print(f"写性能跟踪失败: {e}")
+            return False
+
+    def start(self, root):
+        """开始统计帧时间，显示悬浮信息并定期写跟踪文件（界面构建完成后调用）"""
+        self.root = root
+        self.overlay = Label(size_hint=(None, None), halign="left", valign="top",
+                             font_size=SMALL_CONTENT_FONT_SIZE * 0.5, color=(1, 1, 1, 1))
+        with self.overlay.canvas.before:
+            Color(0, 0, 0, 0.6)
+            overlay_bg = Rectangle()
+
+        def follow(label, *args):
+            label.size = label.texture_size
+            label.pos = (0, Window.height - label.height)
+            overlay_bg.pos, overlay_bg.size = label.pos, label.size
+
+        self.overlay.bind(texture_size=follow)
+        Window.bind(height=lambda *args: follow(self.overlay))
+        Window.add_widget(self.overlay)
+
+        Clock.schedule_interval(self._on_frame, 0)
+        Clock.schedule_interval(self._update_overlay, PROFILE_OVERLAY_INTERVAL)
+        Clock.schedule_interval(self.dump_trace, PROFILE_DUMP_INTERVAL)
+
+    def _on_frame(self, dt):
+        self.frame_ms = dt * 1000
+        self.max_frame_ms = max(self.max_frame_ms, self.frame_ms)
+
+    def _update_overlay(self, dt):
+        self.widget_count = sum(1 for _ in self.root.walk())
+        with self.lock:
+            recent = list(self.latencies.items())[-PROFILE_OVERLAY_LINES:]
+            lines = [f"帧 {self.frame_ms:.1f} ms（最大 {self.max_frame_ms:.1f}）  控件 {self.widget_count}"]
+            lines += [f"{name} {ms:.1f} ms ×{self.counters[name]}" for name, ms in reversed(recent)]
+        self.overlay.text = "\n".join(lines)
+        self.max_frame_ms = 0.0  # 最大帧时间按每个刷新周期统计
+
+
+# 全局性能统计
+profiler = Profiler()
+
+
+def profiled(name: str = None):
+    """热点函数的计时装饰器；PROFILING_ENABLED 为 False 时原样返回函数"""
+    def decorate(func):
+        if not PROFILING_ENABLED:
+            return func
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.record(label, started, (time.perf_counter() - started) * 1000)
+        return wrapper
+    return decorate
+
+
+# ==================== 数据文件格式 ====================
+# 写入的数据格式版本（读取时两种都支持，旧格式的数据文件在加载后自动改写为当前版本）：
+#   1：最初的 JSON 数组，indent=2，每条记录带 time/date/month/year 等全部字段，金额为浮点元 amount，没有 id
+#   3：紧凑格式。第一行是文件头 {"format":"account-book","version":3,"categories":[...],"next_id":...}，
+#      之后每行一条记录 [id, 时间戳, 分类编码, 金额(分), 备注]，时间戳为公元1年1月1日起的分钟数，
+#      没有空白；时间不规范、无法用时间戳无损表示的记录整行保存为完整的 JSON 对象。
+#      next_id 是下一个可用的 id（删除过的最新记录的 id 也不会再分配）
+#   日志（.journal.jsonl）每行一个操作：["+", 记录] 保存（分类直接写名称），["=", 记录] 修改，["x", id] 删除。
+#   ["+", 记录] 中的 id 就是保存时的 id 高水位，重放日志时取日志中出现过的最大 id（包括已删除的）
+# 第 1 版的记录没有 id，加载时按保存顺序编号（见 assign_record_ids）
+DATA_FORMAT_VERSION = 3
+DATA_FORMAT_NAME = "account-book"
+
+
+def _dumps_compact(data) -> str:
+    """不带空白的 JSON（保留中文）"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def parse_record_minutes(record: Dict):
+    """把记录的 "YYYY-MM-DD HH:MM" 时间转换为分钟时间戳；格式不规范或与日期/月份/年份字段不一致时返回 None"""
+    time_str = record["time"]
+    try:
+        if (len(time_str) != 16 or time_str[:10] != record["date"]
+                or time_str[:7] != record["month"] or time_str[:4] != record["year"]):
+            return None
+        return date_ordinal(time_str) * MINUTES_PER_DAY + int(time_str[11:13]) * 60 + int(time_str[14:16])
+    except (ValueError, TypeError):
+        return None
+
+
+def encode_record(record: Dict, codes: Dict[str, int] = None, categories: List[str] = None):
+    """记录 -> 紧凑行 [id, 时间戳, 分类, 金额(分), 备注]；给出 codes 时分类写成编码（新分类追加到 categories）"""
+    if isinstance(record, CompactRecord):
+        minutes = record.minutes
+    else:
+        minutes = parse_record_minutes(record)
+    if minutes is None:
+        return dict(record)
+
+    category = record["category"]
+    if codes is not None:
+        code = codes.get(category)
+        if code is None:
+            code = codes[category] = len(categories)
+            categories.append(category)
+        category = code
+    return [record["id"], minutes, category, record["cents"], record["remark"] or ""]
+
+
+def decode_record(row, categories: List[str] = None):
+    """紧凑行 -> 记录（按 RECORD_LAYOUT 直接构造 CompactRecord 或字典）；完整 JSON 对象原样返回"""
+    if isinstance(row, dict):
+        return row
+    record_id, minutes, category, cents, remark = row
+    if categories is not None:
+        category = categories[category]
+    if RECORD_LAYOUT == "compact":
+        return CompactRecord(minutes, cents, intern_category(category), remark, record_id)
+    date_str, month, year = day_strings(minutes // MINUTES_PER_DAY)
+    return {"id": record_id, "time": format_record_time(minutes), "date": date_str, "month": month, "year": year,
+            "category": category, "remark": remark, "cents": cents}
+
+
+def _decode_header(line: str):
+    """紧凑格式的文件头，返回分类表；版本不受支持时报错"""
+    header = json.loads(line)
+    if header.get("format") != DATA_FORMAT_NAME or header.get("version") != DATA_FORMAT_VERSION:
+        raise ValueError(f"不支持的数据文件格式: {line[:80]}")
+    return header["categories"]
+
+
+def records_file_version(path: str) -> int:
+    """数据文件的格式版本（旧的 JSON 数组为 1）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        line = f.readline()
+    return json.loads(line)["version"] if line.startswith("{") else 1
+
+
+def records_file_next_id(path: str) -> int:
+    """数据文件头记下的下一个可用 id（旧格式没有时为 1）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        line = f.readline()
+    return json.loads(line).get("next_id", 1) if line.startswith("{") else 1
+
+
+def from_v1_record(record: Dict) -> Dict:
+    """第 1 版数据文件中的记录：浮点金额 amount 原地换成整数分 cents"""
+    record["cents"] = to_cents(record.pop("amount", 0))
+    return record
+
+
+def read_records_file(path: str) -> List[Dict]:
+    """读取数据文件（两种格式都支持）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if f.read(1) != "{":
+            f.seek(0)
+            return [from_v1_record(record) for record in json.load(f)]
+        f.seek(0)
+        categories = _decode_header(f.readline())
+        # 每行一条记录（字符串中的换行已转义），拼成一个数组一次解析，比逐行解析快
+        body = ",".join(line for line in f.read().split("\n") if line.strip())
+        return [decode_record(row, categories) for row in json.loads("[" + body + "]")]
+
+
+def write_records_file(path: str, records: List[Dict], next_id: int = None):
+    """按 DATA_FORMAT_VERSION 写出数据文件（先写临时文件再原子替换）；给出 next_id 时写入文件头"""
+    tmp_file = path + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        codes, categories = {}, []
+        lines = [_dumps_compact(encode_record(record, codes, categories)) for record in records]
+        header = {"format": DATA_FORMAT_NAME, "version": DATA_FORMAT_VERSION, "categories": categories}
+        if next_id is not None:
+            header["next_id"] = next_id
+        f.write(_dumps_compact(header) + "\n")
+        for line in lines:
+            f.write(line + "\n")
+    os.replace(tmp_file, path)
+
+
+def encode_journal_entry(entry: Dict) -> str:
+    """日志操作 {"op": "add"/"update"/"del", ...} -> 一行文本"""
+    if entry["op"] == "add":
+        return _dumps_compact(["+", encode_record(entry["record"])])
+    if entry["op"] == "update":
+        return _dumps_compact(["=", encode_record(entry["record"])])
+    return _dumps_compact(["x", entry["id"]])
+
+
+def decode_journal_entry(line: str) -> Dict:
+    """一行日志 -> {"op": "add"/"update"/"del", ...}"""
+    op, value = json.loads(line)
+    if op == "+":
+        return {"op": "add", "record": decode_record(value)}
+    if op == "=":
+        return {"op": "update", "record": decode_record(value)}
+    if op == "x":
+        return {"op": "del", "id": value}
+    raise ValueError(f"未知的日志操作: {op}")
+
+
+# ==================== 记录 id ====================
+# 每条记录有一个不变的整数 id，保存时分配、按保存顺序递增，删除和修改都按 id 定位记录。
+# 记录列表按保存顺序排列，也就是按 id 递增，记录的位置用二分查找得到，不需要另外维护索引
+_record_id_key = itemgetter("id")
+_json_next_id = 1  # json引擎下一个可用的 id（加载时由快照文件头和日志得出，见 _note_json_next_id）
+
+
+def set_record_id(record, record_id: int):
+    """给记录设置 id（只用于给旧格式中没有 id 的记录编号）"""
+    if isinstance(record, CompactRecord):
+        record.record_id = record_id
+    else:
+        record["id"] = record_id
+
+
+def assign_record_ids(records: List[Dict], next_id: int = 1) -> int:
+    """给没有 id 的记录按顺序编号，返回下一个可用的 id"""
+    for record in records:
+        record_id = record.get("id")
+        if record_id is None:
+            set_record_id(record, next_id)
+            record_id = next_id
+        next_id = max(next_id, record_id + 1)
+    return next_id
+
+
+def find_record_position(records: List[Dict], record_id: int):
+    """记录在列表中的位置，找不到返回 None。
+    列表按 id 递增时二分查找；顺序被打乱（如分片引擎中系统时间被往回调过）时从最新的记录往前找"""
+    pos = bisect_left(records, record_id, key=_record_id_key)
+    if pos < len(records) and records[pos]["id"] == record_id:
+        return pos
+    for pos in range(len(records) - 1, -1, -1):
+        if records[pos]["id"] == record_id:
+            return pos
+    return None
+
+
 # ==================== 数据处理函数（强化编码） ====================
 def init_data():
     """初始化数据文件（强制UTF-8编码）"""
     if not os.path.exists(DATA_FILE):
-        # 强制指定encoding='utf-8'，确保中文写入正常
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump([], f, ensure_ascii=False)  # ensure_ascii=False保留中文
+        # write_records_file 以 UTF-8 写入并保留中文
+        write_records_file(DATA_FILE, [])
 
 
-def load_records() -> List[Dict]:
-    """加载所有记账记录（强制UTF-8编码）"""
+def get_journal_file_path():
+    """日志文件与数据文件放在同一目录（advanced_account_records.journal.jsonl）"""
+    base, _ = os.path.splitext(DATA_FILE)
+    return base + ".journal.jsonl"
+
+
+def _append_journal(entry: Dict):
+    """向日志末尾追加一条操作（每行一个，格式见 DATA_FORMAT_VERSION）"""
+    line = encode_journal_entry(entry) + "\n"
+    with open(get_journal_file_path(), 'a+b') as f:
+        # 上次写入若被中断，末尾没有换行，先补一个换行，避免新记录和半行粘在一起
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        f.write(line.encode('utf-8'))
+
+
+def _read_snapshot() -> List[Dict]:
+    """读取快照文件"""
     init_data()
-    with open(DATA_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return read_records_file(DATA_FILE)
+
+
+def _read_journal() -> List[Dict]:
+    """读取日志中的全部操作"""
+    journal_file = get_journal_file_path()
+    if not os.path.exists(journal_file):
+        return []
+
+    entries = []
+    with open(journal_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(decode_journal_entry(line))
+            except (ValueError, IndexError, TypeError):
+                # 写入中途断电可能留下半行，跳过即可，前面的操作不受影响
+                print(f"跳过损坏的日志行: {line[:50]}")
+    return entries
+
+
+def _replay_journal(records: List[Dict], entries: List[Dict] = None) -> List[Dict]:
+    """在快照之上按顺序重放日志：add 追加记录，update 按 id 替换记录，del 为删除墓碑"""
+    if entries is None:
+        entries = _read_journal()
+    if records and records[0].get("id") is None:
+        # 第 1 版的快照没有 id：按保存顺序编号，每次加载的编号相同
+        assign_record_ids(records)
+    for entry in entries:
+        op = entry["op"]
+        if op == "add":
+            records.append(entry["record"])
+        elif op == "update":
+            pos = find_record_position(records, entry["record"]["id"])
+            if pos is not None:
+                records[pos] = entry["record"]
+        else:
+            pos = find_record_position(records, entry["id"])
+            if pos is not None:
+                records.pop(pos)
+    return records
+
+
+def compact_records(records: List[Dict] = None) -> bool:
+    """把日志合并进快照（先写临时文件再原子替换），然后清空日志；id 高水位写入快照文件头"""
+    try:
+        if records is None:
+            records = _read_json_records()
+        next_id = max(_json_next_id, records[-1]["id"] + 1 if records else 1)
+        write_records_file(DATA_FILE, records, next_id)
+
+        journal_file = get_journal_file_path()
+        if os.path.exists(journal_file):
+            os.remove(journal_file)
+        return True
+    except Exception as e:
+        print(f"合并日志失败: {e}")
+        return False
+
+
+def _note_json_next_id(records: List[Dict], entries: List[Dict]):
+    """记下 JSON 引擎的 id 高水位：快照文件头的 next_id、日志中出现过的 id（包括已删除的）和现有记录 id 的最大值"""
+    global _json_next_id
+    next_id = max(records_file_next_id(DATA_FILE), records[-1]["id"] + 1 if records else 1)
+    for entry in entries:
+        record_id = entry["record"]["id"] if "record" in entry else entry["id"]
+        next_id = max(next_id, record_id + 1)
+    _json_next_id = next_id
+
+
+def _read_json_records() -> List[Dict]:
+    """只读地读取 JSON 快照 + 日志（不改写数据文件），供迁移到其他引擎使用"""
+    entries = _read_journal()
+    records = _replay_journal(_read_snapshot(), entries)
+    _note_json_next_id(records, entries)
+    return records
+
+
+def _load_json_records() -> List[Dict]:
+    """从 JSON 快照 + 日志加载记录"""
+    entries = _read_journal()
+    records = _replay_journal(_read_snapshot(), entries)
+    _note_json_next_id(records, entries)
+    _finish_json_load(records)
+    return records
+
+
+def _finish_json_load(records: List[Dict]):
+    """加载完成后的维护：快照是第 1 版格式或日志过长时合并成新快照"""
+    # 第 1 版的浮点金额读取时已转换为整数分，立即写回新格式（只发生一次）
+    outdated = records_file_version(DATA_FILE) != DATA_FORMAT_VERSION
+    if outdated:
+        print(f"数据文件改写为第 {DATA_FORMAT_VERSION} 版格式")
+
+    # 日志过长时顺便合并，避免重放成本无限增长
+    journal_file = get_journal_file_path()
+    if outdated or (os.path.exists(journal_file)
+                                and os.path.getsize(journal_file) > JOURNAL_COMPACT_BYTES):
+        compact_records(records)
+
+
+# ==================== SQLite 存储引擎 ====================
+# 记录字段顺序（与数据库列一致）
+RECORD_FIELDS = ["id", "time", "date", "month", "year", "category", "remark", "cents"]
+
+_sqlite_conn = None
+_sqlite_conn_path = None
+
+
+def get_sqlite_file_path():
+    """数据库文件与数据文件放在同一目录（advanced_account_records.db）"""
+    base, _ = os.path.splitext(DATA_FILE)
+    return base + ".db"
+
+
+def _get_sqlite_connection():
+    """获取SQLite连接（首次调用时建表、建索引，并迁移旧的JSON数据）"""
+    global _sqlite_conn, _sqlite_conn_path
+    db_file = get_sqlite_file_path()
+    if _sqlite_conn is not None and _sqlite_conn_path == db_file:
+        return _sqlite_conn
+
+    import sqlite3  # 只有启用sqlite引擎时才需要
+    # 写入在 I/O 线程中执行，读取在主线程，连接需要允许跨线程使用（写入由 I/O 线程串行执行）
+    conn = sqlite3.connect(db_file, check_same_thread=False)
+    # WAL模式：写入只追加到-wal文件，读写互不阻塞
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            time TEXT NOT NULL,
+            date TEXT NOT NULL,
+            month TEXT NOT NULL,
+            year TEXT NOT NULL,
+            category TEXT NOT NULL,
+            remark TEXT NOT NULL DEFAULT '',
+            cents INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """)
+    conn.executescript("""
+        CREATE INDEX IF NOT EXISTS idx_records_date ON records(date);
+        CREATE INDEX IF NOT EXISTS idx_records_month ON records(month);
+        CREATE INDEX IF NOT EXISTS idx_records_year ON records(year);
+        CREATE INDEX IF NOT EXISTS idx_records_category ON records(category);
+    """)
+    _migrate_json_to_sqlite(conn)
+
+    _sqlite_conn, _sqlite_conn_path = conn, db_file
+    return conn
+
+
+def _migrate_json_to_sqlite(conn):
+    """一次性把 advanced_account_records.json（含日志）导入数据库，原文件保留作为备份"""
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+        return
+
+    with conn:
+        if os.path.exists(DATA_FILE):
+            # 只读方式读取，原数据文件和日志保持原样，作为备份
+            records = _read_json_records()
+            conn.executemany(
+                "INSERT INTO records (id, time, date, month, year, category, remark, cents) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(r["id"], r["time"], r["date"], r["month"], r["year"], r["category"],
+                  r.get("remark") or "", r["cents"]) for r in records]
+            )
+            # JSON 中删除过的最新记录的 id 也不能再分配：AUTOINCREMENT 的计数从 id 高水位接着往下
+            if conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'records'",
+                            (_json_next_id - 1,)).rowcount == 0:
+                conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('records', ?)",
+                             (_json_next_id - 1,))
+            print(f"已从 {DATA_FILE} 迁移 {len(records)} 条记录到 SQLite")
+        conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)",
+                     (datetime.now().isoformat(),))
+
+
+def _sqlite_where(conditions):
+    """把 [(SQL片段, 参数...), ...] 拼成 WHERE 子句"""
+    if not conditions:
+        return "", []
+    params = []
+    for condition in conditions:
+        params.extend(condition[1:])
+    return " WHERE " + " AND ".join(c[0] for c in conditions), params
+
+
+def _sqlite_select(conditions) -> List[Dict]:
+    """按条件查询记录（按插入顺序返回）"""
+    where, params = _sqlite_where(conditions)
+    rows = _get_sqlite_connection().execute(
+        "SELECT id, time, date, month, year, category, remark, cents FROM records" + where + " ORDER BY id",
+        params
+    ).fetchall()
+    return [dict(zip(RECORD_FIELDS, row)) for row in rows]
+
+
+def _sqlite_next_id() -> int:
+    """数据库中下一个可用的记录 id（AUTOINCREMENT 不会复用删除过的 id）"""
+    row = _get_sqlite_connection().execute("SELECT seq FROM sqlite_sequence WHERE name = 'records'").fetchone()
+    return row[0] + 1 if row else 1
+
+
+def _sqlite_group_sum(group_field: str, conditions, category_filter: str = "总和"):
+    """按字段分组求和（SUM 在数据库内完成，走索引）"""
+    conditions = list(conditions)
+    if category_filter != "总和":
+        conditions.append(("category = ?", category_filter))
+    where, params = _sqlite_where(conditions)
+    return _get_sqlite_connection().execute(
+        f"SELECT {group_field}, SUM(cents) FROM records{where} GROUP BY {group_field}", params
+    ).fetchall()
+
+
+def _sqlite_time_conditions(filter_type: str, target_value: str = ""):
+    """时间筛选对应的SQL条件"""
+    condition = _time_filter_condition(filter_type, target_value)
+    if condition is None:
+        return []
+    field, value = condition
+    return [(f"{field} = ?", value)]
+
+
+# ==================== 按月分片存储引擎 ====================
+# 每个月的记录单独存成一个分片文件，清单文件记录各分片的条数和各分类金额：
+# 月/年/分类的统计只读清单，按日统计和时间筛选只加载涉及的月份，保存只重写当月分片
+SHARD_CACHE_MONTHS = 12  # 内存中最多保留的分片数（够一年的查询），超出时丢弃最久未用的
+
+
+def get_shard_dir():
+    """分片目录与数据文件放在同一目录（advanced_account_records.shards）"""
+    base, _ = os.path.splitext(DATA_FILE)
+    return base + ".shards"
+
+
+def get_shard_manifest_path():
+    return os.path.join(get_shard_dir(), "manifest.json")
+
+
+def _write_json_atomic(path: str, data):
+    """写清单文件：先写临时文件再原子替换，写入中途失败不会留下半个文件"""
+    tmp_file = path + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, path)
+
+
+class ShardStore:
+    """按月分片的记录存储。记录的全局顺序为各分片按月份先后拼接（同月内按保存顺序），
+    删除和修改由记录的月份找到分片，只加载和重写这一个分片"""
+
+    def __init__(self):
+        self.lock = threading.RLock()  # 写入在 I/O 线程，查询在主线程和统计线程
+        self._dir = None
+        self._manifest = None  # {"version": 1, "next_id": 下一个记录 id, "shards": {"2026-01": {"count", "cents", "categories"}}}
+        self._cache = OrderedDict()  # 月份 -> 记录列表，最近使用的排在最后
+        # 已提交给 I/O 线程、还没写入分片的修改 [(记录, +1 新增 / -1 移除)]，按提交顺序排列；
+        # 查询时叠加到清单和分片上，不用等待写盘（修改 = 移除旧记录 + 新增新记录）
+        self._pending = []
+
+    def _ensure_open(self):
+        """读取清单（数据文件路径变化时重新打开）；没有清单时从 JSON 数据文件迁移"""
+        shard_dir = get_shard_dir()
+        if self._manifest is not None and self._dir == shard_dir:
+            return
+        self._dir = shard_dir
+        self._cache.clear()
+        manifest_file = get_shard_manifest_path()
+        if os.path.exists(manifest_file):
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                self._manifest = json.load(f)
+        else:
+            self._migrate_from_json()
+
+    def _migrate_from_json(self):
+        """一次性把 advanced_account_records.json（含日志）按月份拆分，原文件保留作为备份"""
+        os.makedirs(self._dir, exist_ok=True)
+        # 只读方式读取，原数据文件和日志保持原样，作为备份
+        records = _read_json_records() if os.path.exists(DATA_FILE) else []
+        months = defaultdict(list)
+        for record in records:
+            months[record["month"]].append(record)
+
+        # 按全局顺序（月份先后）重新编号，分片拼接后仍按 id 递增
+        next_id = 1
+        for month in sorted(months):
+            for record in months[month]:
+                set_record_id(record, next_id)
+                next_id += 1
+        self._manifest = {"version": 1, "next_id": next_id, "shards": {}}
+        for month, shard in months.items():
+            write_records_file(self._shard_path(month), shard)
+            self._manifest["shards"][month] = self._summarize(shard)
+        _write_json_atomic(get_shard_manifest_path(), self._manifest)
+        if records:
+            print(f"已把 {len(records)} 条记录拆分为 {len(months)} 个月份分片")
+
+    def _shard_path(self, month: str) -> str:
+        return os.path.join(self._dir, month + ".json")
+
+    @staticmethod
+    def _summarize(records: List[Dict]) -> Dict:
+        """分片的清单条目：条数、总金额和各分类金额（整数分）"""
+        categories = defaultdict(int)
+        for record in records:
+            categories[record["category"]] += record["cents"]
+        return {"count": len(records), "cents": sum(categories.values()), "categories": dict(categories)}
+
+    def _read_shard(self, month: str) -> List[Dict]:
+        path = self._shard_path(month)
+        if not os.path.exists(path):
+            return []
+        records = read_records_file(path)
+        # 上次写完分片、还没写清单时中断：以分片内容为准修正清单
+        entry = self._manifest["shards"].get(month)
+        if (entry["count"] if entry else 0) != len(records):
+            self._set_entry(month, records)
+            _write_json_atomic(get_shard_manifest_path(), self._manifest)
+        return records
+
+    def _set_entry(self, month: str, records: List[Dict]):
+        if records:
+            self._manifest["shards"][month] = self._summarize(records)
+        else:
+            self._manifest["shards"].pop(month, None)
+
+    def shard(self, month: str) -> List[Dict]:
+        """某个月份的记录（按需加载，超出缓存数时丢弃最久未用的分片）"""
+        with self.lock:
+            self._ensure_open()
+            records = self._cache.get(month)
+            if records is None:
+                records = self._cache[month] = self._read_shard(month)
+            self._cache.move_to_end(month)
+            while len(self._cache) > SHARD_CACHE_MONTHS:
+                self._cache.popitem(last=False)
+            return records
+
+    def months(self) -> List[str]:
+        """有记录的月份（从早到晚）"""
+        with self.lock:
+            self._ensure_open()
+            return sorted(self._manifest["shards"])
+
+    def all_records(self) -> List[Dict]:
+        """全部记录（按全局顺序）；不经过缓存，避免把最近使用的分片挤出去"""
+        with self.lock:
+            records = []
+            for month in self.months():
+                cached = self._cache.get(month)
+                records.extend(cached if cached is not None else self._read_shard(month))
+            return records
+
+    def invalidate(self):
+        """丢弃内存中的清单和分片（写入失败后以磁盘内容为准）"""
+        with self.lock:
+            self._manifest = None
+            self._cache.clear()
+
+    def stage(self, record: Dict, sign: int):
+        """主线程提交写入时登记待写入的修改（I/O 线程写完分片后在同一把锁内注销）"""
+        with self.lock:
+            self._pending.append((record, sign))
+
+    def _unstage(self, record_id: int, sign: int):
+        """注销最早登记的一条对应修改（写入按提交顺序执行，先登记的先完成）"""
+        for i, (record, pending_sign) in enumerate(self._pending):
+            if pending_sign == sign and record["id"] == record_id:
+                del self._pending[i]
+                return
+
+    def discard_pending(self):
+        """写入失败、排队的写入被跳过时丢弃全部待写入的修改"""
+        with self.lock:
+            self._pending.clear()
+
+    def _with_pending(self, records: List[Dict], keep) -> List[Dict]:
+        """把待写入的修改叠加到 records 上（新增的记录只保留满足 keep 的），按 id 排序"""
+        if not self._pending:
+            return records
+        removed = {record["id"] for record, sign in self._pending if sign < 0}
+        result = [record for record in records if record["id"] not in removed]
+        result.extend(record for record, sign in self._pending if sign > 0 and keep(record))
+        result.sort(key=_record_id_key)
+        return result
+
+    def _pending_totals(self, keep) -> Dict[str, int]:
+        """待写入的修改对各分类金额的影响（只统计满足 keep 的记录）"""
+        totals = defaultdict(int)
+        for record, sign in self._pending:
+            if keep(record):
+                totals[record["category"]] += sign * record["cents"]
+        return totals
+
+    def _rewrite(self, month: str, records: List[Dict]):
+        """重写一个分片和清单"""
+        try:
+            write_records_file(self._shard_path(month), records)
+            self._set_entry(month, records)
+            _write_json_atomic(get_shard_manifest_path(), self._manifest)
+        except Exception:
+            self.invalidate()
+            raise
+
+    def append(self, record: Dict):
+        """追加一条记录：只重写记录所在月份（即当月）的分片"""
+        with self.lock:
+            try:
+                records = self.shard(record["month"])
+                records.append(record)
+                self._manifest["next_id"] = max(self._manifest["next_id"], record["id"] + 1)
+                self._rewrite(record["month"], records)
+            finally:
+                self._unstage(record["id"], 1)
+
+    def next_id(self) -> int:
+        """下一个可用的记录 id（只读清单）"""
+        with self.lock:
+            self._ensure_open()
+            return self._manifest["next_id"]
+
+    def _locate(self, record: Dict):
+        """记录所在分片的列表和在分片内的位置（记录的月份不会改变）"""
+        records = self.shard(record["month"])
+        pos = find_record_position(records, record["id"])
+        if pos is None:
+            raise KeyError(f"记录不存在: {record['id']}")
+        return records, pos
+
+    def update(self, record: Dict):
+        """用 record 替换 id 相同的记录：只重写该记录所在的分片"""
+        with self.lock:
+            try:
+                records, pos = self._locate(record)
+                records[pos] = record
+                self._rewrite(record["month"], records)
+            finally:
+                self._unstage(record["id"], -1)
+                self._unstage(record["id"], 1)
+
+    def delete(self, record: Dict):
+        """删除 id 与 record 相同的记录：只重写该记录所在的分片"""
+        with self.lock:
+            try:
+                records, pos = self._locate(record)
+                records.pop(pos)
+                self._rewrite(record["month"], records)
+            finally:
+                self._unstage(record["id"], -1)
+
+    # ---- 查询（叠加排队中的修改，与界面上刚保存/修改/删除的结果一致，不等待写盘） ----
+    def period_total(self, period: str, category_filter: str = "总和") -> int:
+        """某月（YYYY-MM）或某年（YYYY）的金额，只读清单"""
+        def keep(record):
+            return ((record["month"] == period or record["year"] == period)
+                    and (category_filter == "总和" or record["category"] == category_filter))
+
+        with self.lock:
+            total = sum(self._pending_totals(keep).values())
+            for month in self.months():
+                if month == period or month[:4] == period:
+                    entry = self._manifest["shards"][month]
+                    total += entry["cents"] if category_filter == "总和" else entry["categories"].get(category_filter, 0)
+            return total
+
+    def category_totals(self, filter_type: str, target_value: str = "") -> Dict[str, int]:
+        """时间筛选范围内各分类的金额；按日筛选时加载当月分片，其余只读清单"""
+        condition = _time_filter_condition(filter_type, target_value)
+
+        def keep(record):
+            return condition is None or record[condition[0]] == condition[1]
+
+        with self.lock:
+            totals = self._pending_totals(keep)
+            if condition is not None and condition[0] == "date":
+                for record in self.shard(condition[1][:7]):
+                    if record_periods(record)[0] == condition[1]:
+                        totals[record["category"]] += record["cents"]
+                return totals
+            for month in self.months():
+                if condition is None or month == condition[1] or month[:4] == condition[1]:
+                    for category, cents in self._manifest["shards"][month]["categories"].items():
+                        totals[category] += cents
+            return totals
+
+    def filter_records(self, filter_type: str, target_value: str = "") -> List[Dict]:
+        """按时间筛选记录，只加载涉及的月份"""
+        condition = _time_filter_condition(filter_type, target_value)
+        if condition is None:
+            with self.lock:
+                return self._with_pending(self.all_records(), lambda record: True)
+        field, value = condition
+        if field == "date":
+            with self.lock:
+                return self._with_pending([r for r in self.shard(value[:7]) if record_periods(r)[0] == value],
+                                          lambda record: record["date"] == value)
+        if field == "month":
+            return self.records_between(value + "-01", value + "-31")
+        return self.records_between(value + "-01-01", value + "-12-31")
+
+    def records_between(self, start_date: str, end_date: str) -> List[Dict]:
+        """start_date ~ end_date（YYYY-MM-DD，含两端）之间的记录，只加载涉及的月份"""
+        with self.lock:
+            records = []
+            for month in self.months():
+                if start_date[:7] <= month <= end_date[:7]:
+                    shard = self.shard(month)
+                    if start_date <= month + "-01" and month + "-31" <= end_date:
+                        records.extend(shard)  # 整月都在范围内，不必逐条比较日期
+                    else:
+                        records.extend(r for r in shard if start_date <= record_periods(r)[0] <= end_date)
+            return self._with_pending(records, lambda record: start_date <= record["date"] <= end_date)
+
+
+# 全局分片存储（只在 STORAGE_ENGINE 为 "sharded" 时使用）
+shard_store = ShardStore()
+
+
+# ==================== 流式加载 ====================
+# 启动时从快照末尾往前分块解析，最新的记录先分批发布给界面（记录页可以立即显示最近的记录），
+# 全部解析完成后再安装完整的记录列表并通知各页面刷新总额（只用于 json 引擎）
+STREAM_LOADING = True
+STREAM_CHUNK_BYTES = 64 * 1024
+STREAM_FIRST_BATCH = 50  # 第一批发布的记录数（够记录页首屏显示）
+STREAM_BATCH_GROWTH = 4  # 之后每批是上一批的几倍，发布次数只随记录数对数增长
+
+
+def _reversed_lines(path: str, chunk_bytes: int = STREAM_CHUNK_BYTES):
+    """从文件末尾往前按块读取，逐行产出（不含换行符）"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        rest = b""
+        while position > 0:
+            size = min(chunk_bytes, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + rest).split(b"\n")
+            # 块开头的一行可能不完整，留给下一块拼接（按 \n 切分不会切断 UTF-8 字符）
+            rest = lines[0]
+            for line in reversed(lines[1:]):
+                yield line.decode('utf-8')
+        yield rest.decode('utf-8')
+
+
+def iter_snapshot_newest_first(path: str, chunk_bytes: int = STREAM_CHUNK_BYTES):
+    """按从新到旧的顺序逐条产出快照中的记录。
+    紧凑格式每行一条记录，从文件末尾往前逐行解析即可；旧格式由 json.dump(indent=2) 写出，
+    每条记录以单独一行 "  {" 开始、"  }" 或 "  }," 结束（字符串中的换行会被转义，不会出现这样的行），
+    同样可以往前逐条解析；其他格式整体解析后倒序"""
+    with open(path, 'r', encoding='utf-8') as f:
+        head = [f.readline().rstrip("\r\n"), f.readline().rstrip("\r\n")]
+    if head[0].startswith("{"):
+        categories = _decode_header(head[0])
+        for line in _reversed_lines(path, chunk_bytes):
+            line = line.strip()
+            if line:
+                row = json.loads(line)
+                if isinstance(row, dict) and "format" in row:
+                    return  # 到达文件头
+                yield decode_record(row, categories)
+        return
+    if head != ["[", "  {"]:
+        with open(path, 'r', encoding='utf-8') as f:
+            for record in reversed(json.load(f)):
+                yield from_v1_record(record)
+        return
+
+    block = None
+    for line in _reversed_lines(path, chunk_bytes):
+        line = line.rstrip("\r")
+        if block is None:
+            if line in ("  }", "  },"):
+                block = ["}"]
+        elif line == "  {":
+            block.append("{")
+            yield from_v1_record(json.loads("".join(reversed(block))))
+            block = None
+        else:
+            block.append(line)
+
+
+# ==================== 统一的记录访问接口 ====================
+@profiled()
+def load_records() -> List[Dict]:
+    """从磁盘加载所有记账记录（强制UTF-8编码）；页面请通过 record_repository 读取"""
+    if STORAGE_ENGINE == "sqlite":
+        return _sqlite_select([])
+    if STORAGE_ENGINE == "sharded":
+        return shard_store.all_records()
+    return _load_json_records()
+
+
+def _persist_record(record: Dict):
+    """把一条新记录写入存储引擎（json引擎只追加一行日志）"""
+    if STORAGE_ENGINE == "sqlite":
+        conn = _get_sqlite_connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO records (id, time, date, month, year, category, remark, cents) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [record[field] for field in RECORD_FIELDS]
+            )
+    elif STORAGE_ENGINE == "sharded":
+        shard_store.append(dict(record))
+    else:
+        # 关键：ensure_ascii=False 保留中文，encoding='utf-8' 确保编码正确
+        _append_journal({"op": "add", "record": dict(record)})
+
+
+def _stage_write(record: Dict, sign: int):
+    """登记刚提交、还没写盘的修改（sign 为 +1 新增或 -1 移除）；分片引擎的查询叠加这些修改，不必等待写盘"""
+    if STORAGE_ENGINE == "sharded":
+        shard_store.stage(record, sign)
+
+
+def _persist_update(record: Dict):
+    """把修改后的记录写入存储引擎（只有分类、备注和金额可以修改；json引擎追加一行修改日志）"""
+    if STORAGE_ENGINE == "sqlite":
+        conn = _get_sqlite_connection()
+        with conn:
+            conn.execute(
+                "UPDATE records SET category = ?, remark = ?, cents = ? WHERE id = ?",
+                (record["category"], record["remark"], record["cents"], record["id"])
+            )
+    elif STORAGE_ENGINE == "sharded":
+        shard_store.update(dict(record))
+    else:
+        _append_journal({"op": "update", "record": dict(record)})
+
+
+def _persist_delete(record: Dict):
+    """从存储引擎删除 id 与 record 相同的记录（json引擎追加一条删除墓碑）"""
+    if STORAGE_ENGINE == "sqlite":
+        conn = _get_sqlite_connection()
+        with conn:
+            # 按主键删除，不随记录数增长
+            conn.execute("DELETE FROM records WHERE id = ?", (record["id"],))
+    elif STORAGE_ENGINE == "sharded":
+        shard_store.delete(record)
+    else:
+        _append_journal({"op": "del", "id": record["id"]})
+
+
+# ==================== 汇总表（日/月/年 × 分类） ====================
+# 汇总表层级与记录字段的对应关系
+ROLLUP_LEVELS = {"day": "date", "month": "month", "year": "year"}
+
+
+def get_rollup_file_path():
+    """汇总表文件与数据文件放在同一目录（advanced_account_records.rollups.json）"""
+    base, _ = os.path.splitext(DATA_FILE)
+    return base + ".rollups.json"
+
+
+class RollupTables:
+    """按 日/月/年 × 分类 汇总的金额表（整数分），保存和删除时 O(1) 增量更新"""
+
+    def __init__(self, tables: Dict = None):
+        # {"day": {"2026-01-13": {"吃饭": 1250, ...}}, "month": {...}, "year": {...}}
+        self.tables = tables or {level: {} for level in ROLLUP_LEVELS}
+
+    @classmethod
+    def from_records(cls, records: List[Dict]):
+        """全量重建（用于首次构建和一致性检查）"""
+        rollups = cls()
+        for record in records:
+            rollups.add(record)
+        return rollups
+
+    def _apply(self, record: Dict, cents: int):
+        category = record["category"]
+        # ROLLUP_LEVELS 的顺序（日、月、年）与 record_periods 一致
+        for level, period in zip(ROLLUP_LEVELS, record_periods(record)):
+            totals = self.tables[level].setdefault(period, {})
+            totals[category] = totals.get(category, 0) + cents
+
+    def add(self, record: Dict):
+        self._apply(record, record["cents"])
+
+    def remove(self, record: Dict):
+        self._apply(record, -record["cents"])
+
+    def category_totals(self, level: str, period: str) -> Dict[str, int]:
+        """某个周期内各分类的金额"""
+        return self.tables[level].get(period, {})
+
+    def total(self, level: str, period: str, category_filter: str = "总和") -> int:
+        """某个周期的金额（"总和"表示所有分类）"""
+        totals = self.tables[level].get(period, {})
+        if category_filter == "总和":
+            return sum(totals.values())
+        return totals.get(category_filter, 0)
+
+    def copy(self):
+        """独立的副本（统计线程在仓库锁外读取，主线程继续增量更新原表）"""
+        return RollupTables({level: {period: dict(totals) for period, totals in periods.items()}
+                             for level, periods in self.tables.items()})
+
+    def __eq__(self, other):
+        if not isinstance(other, RollupTables):
+            return NotImplemented
+
+        def normalized(tables):
+            # 忽略金额为0的项（删除后留下的空分类）
+            return {
+                level: {period: {c: a for c, a in totals.items() if a}
+                        for period, totals in periods.items() if any(totals.values())}
+                for level, periods in tables.items()
+            }
+        return normalized(self.tables) == normalized(other.tables)
+
+
+def _signature_to_json(signature):
+    return [[os.path.basename(path), mtime, size] for path, mtime, size in signature]
+
+
+def load_rollups(signature):
+    """读取保存的汇总表；数据文件在保存之后被改动过（签名不一致）时返回 None"""
+    rollup_file = get_rollup_file_path()
+    try:
+        if os.path.exists(rollup_file):
+            with open(rollup_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("signature") == _signature_to_json(signature):
+                return RollupTables(data["tables"])
+    except Exception as e:
+        print(f"加载汇总表失败: {e}")
+    return None
 
 
-def save_record(category: str, remark: str, amount: float) -> bool:
-    """保存支出记录（强制UTF-8编码）"""
+def save_rollups(rollups: RollupTables, signature) -> bool:
+    """保存汇总表，并记录对应数据文件的签名"""
+    try:
+        tmp_file = get_rollup_file_path() + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"signature": _signature_to_json(signature), "tables": rollups.tables},
+                      f, ensure_ascii=False)
+        os.replace(tmp_file, get_rollup_file_path())
+        return True
+    except Exception as e:
+        print(f"保存汇总表失败: {e}")
+        return False
+
+
+# ==================== 日期工具 ====================
+def date_ordinal(date_str: str) -> int:
+    """把 YYYY-MM-DD 转换为整数日序数（公元1年1月1日为1）"""
+    return datetime(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10])).toordinal()
+
+
+# 日序数 -> (日期, 月份, 年份) 字符串；记账跨越的日子只有几千个，同一天的记录共用同一组字符串
+_day_strings_cache = {}
+
+
+def day_strings(ordinal: int):
+    """日序数 -> ("YYYY-MM-DD", "YYYY-MM", "YYYY")（按日缓存，不必每次读取都重新格式化）"""
+    strings = _day_strings_cache.get(ordinal)
+    if strings is None:
+        day = datetime.fromordinal(ordinal)
+        date_str = f"{day.year:04d}-{day.month:02d}-{day.day:02d}"
+        strings = _day_strings_cache[ordinal] = (date_str, date_str[:7], date_str[:4])
+    return strings
+
+
+# ==================== 紧凑记录 ====================
+# 内存中的记录布局："compact" 使用 CompactRecord（只保存分钟时间戳、整数分、分类编码和备注），
+# "dict" 保持从文件读出的原始字典
+RECORD_LAYOUT = "compact"
+MINUTES_PER_DAY = 24 * 60
+
+# 由时间戳推导的字段在 day_strings 结果中的位置
+_DAY_FIELDS = {"date": 0, "month": 1, "year": 2}
+
+# 分类字符串驻留表：每条记录只保存编码
+_category_table = []
+_category_codes = {}
+_category_lock = threading.Lock()  # 预加载在 I/O 线程中登记分类
+
+
+def intern_category(category: str) -> int:
+    """返回分类的编码（首次出现时登记）"""
+    code = _category_codes.get(category)
+    if code is None:
+        with _category_lock:
+            code = _category_codes.get(category)
+            if code is None:
+                _category_table.append(category)
+                code = _category_codes[category] = len(_category_table) - 1
+    return code
+
+
+class CompactRecord(Mapping):
+    """紧凑的只读记录：一个整数时间戳（公元1年1月1日起的分钟数）、整数金额（分）、分类编码、备注和记录 id。
+    time/date/month/year 按需从时间戳推导，读取方式与原来的字典相同（record["date"]）"""
+
+    __slots__ = ("minutes", "cents", "category_code", "remark", "record_id")
+
+    def __init__(self, minutes: int, cents: int, category_code: int, remark: str, record_id: int = None):
+        self.minutes = minutes
+        self.cents = cents
+        self.category_code = category_code
+        self.remark = remark
+        self.record_id = record_id
+
+    @classmethod
+    def from_dict(cls, record: Dict):
+        """由字典记录转换；时间格式不规范等无法无损表示时返回 None"""
+        minutes = parse_record_minutes(record)
+        if minutes is None:
+            return None
+        return cls(minutes, int(record["cents"]), intern_category(record["category"]), record.get("remark") or "",
+                   record.get("id"))
+
+    def __getitem__(self, key):
+        # 按筛选和统计中读取的频率排列
+        field = _DAY_FIELDS.get(key)
+        if field is not None:
+            return day_strings(self.minutes // MINUTES_PER_DAY)[field]
+        if key == "cents":
+            return self.cents
+        if key == "category":
+            return _category_table[self.category_code]
+        if key == "id":
+            return self.record_id
+        if key == "remark":
+            return self.remark
+        if key == "time":
+            return format_record_time(self.minutes)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(RECORD_FIELDS)
+
+    def __len__(self):
+        return len(RECORD_FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def format_record_time(minutes: int) -> str:
+    """分钟时间戳 -> 时间字符串 YYYY-MM-DD HH:MM"""
+    hour, minute = divmod(minutes % MINUTES_PER_DAY, 60)
+    return f"{day_strings(minutes // MINUTES_PER_DAY)[0]} {hour:02d}:{minute:02d}"
+
+
+def pack_record(record: Dict):
+    """按 RECORD_LAYOUT 转换成内存中使用的记录（无法无损转换时保留字典）"""
+    if RECORD_LAYOUT == "compact" and not isinstance(record, CompactRecord):
+        return CompactRecord.from_dict(record) or record
+    return record
+
+
+def record_periods(record):
+    """记录的 (日期, 月份, 年份) 字符串（紧凑记录一次查表得到三个字段）"""
+    if isinstance(record, CompactRecord):
+        return day_strings(record.minutes // MINUTES_PER_DAY)
+    return record["date"], record["month"], record["year"]
+
+
+def record_ordinal(record) -> int:
+    """记录的日序数（紧凑记录直接由时间戳得到，不用解析日期字符串）"""
+    if isinstance(record, CompactRecord):
+        return record.minutes // MINUTES_PER_DAY
+    return date_ordinal(record["date"])
+
+
+def record_memory_report(count: int = 100000) -> Dict[str, float]:
+    """比较 count 条记录在字典布局和紧凑布局下的内存占用（字节/条），并打印结果"""
+    import random
+    import tracemalloc
+
+    # 生成与数据文件格式相同的 JSON，按加载数据文件的方式解析
+    start = datetime(2020, 1, 1)
+    remarks = ["麦当劳", "地铁3号线", "超市", "房租", "生日礼物", ""]
+    sample = []
+    for i in range(count):
+        t = start + timedelta(minutes=random.randint(0, 6 * 365 * MINUTES_PER_DAY))
+        sample.append({
+            "time": t.strftime("%Y-%m-%d %H:%M"),
+            "date": t.strftime("%Y-%m-%d"),
+            "month": t.strftime("%Y-%m"),
+            "year": t.strftime("%Y"),
+            "category": random.choice(EXPENSE_CATEGORIES),
+            "remark": random.choice(remarks),
+            "cents": random.randint(100, 50000)
+        })
+    text = json.dumps(sample, ensure_ascii=False)
+    del sample
+
+    tracemalloc.start()
+    dict_records = json.loads(text)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    del dict_records
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    compact_records = [CompactRecord.from_dict(record) for record in json.loads(text)]
+    compact_bytes = tracemalloc.get_traced_memory()[0]
+    del compact_records
+    tracemalloc.stop()
+
+    report = {"dict": dict_bytes / count, "compact": compact_bytes / count}
+    print(f"{count} 条记录：字典 {report['dict']:.0f} 字节/条，紧凑 {report['compact']:.0f} 字节/条"
+          f"（{report['compact'] / report['dict']:.0%}）")
+    return report
+
+
+# ==================== 日期索引 ====================
+class DateIndex:
+    """按日期序数排序的记录索引（数组存储），时间筛选变为两次二分查找 + 切片。
+    只服务于 records 为 None 的 filter_records_by_time / filter_records_by_date_range（界面的总额和统计走汇总表），
+    第一次调用时才构建，没有调用时保存/删除也不维护它"""
+
+    def __init__(self, records: List[Dict]):
+        ordinals = [record_ordinal(record) for record in records]
+        # 稳定排序：同一天的记录保持保存顺序
+        order = sorted(range(len(records)), key=ordinals.__getitem__)
+        self.ordinals = array('l', (ordinals[i] for i in order))
+        self.records = [records[i] for i in order]
+
+    def add(self, record: Dict):
+        ordinal = record_ordinal(record)
+        # 新记录通常是今天的，直接落在末尾；同一天内按 id 排列（修改过的记录放回原来的位置）
+        pos = bisect_right(self.ordinals, ordinal)
+        while pos > 0 and self.ordinals[pos - 1] == ordinal and self.records[pos - 1]["id"] > record["id"]:
+            pos -= 1
+        self.ordinals.insert(pos, ordinal)
+        self.records.insert(pos, record)
+
+    def remove(self, record: Dict):
+        ordinal = record_ordinal(record)
+        for pos in range(bisect_left(self.ordinals, ordinal), bisect_right(self.ordinals, ordinal)):
+            if self.records[pos] is record:
+                del self.ordinals[pos]
+                del self.records[pos]
+                return
+
+    def range(self, start_ordinal: int, end_ordinal: int) -> List[Dict]:
+        """日期在 [start_ordinal, end_ordinal] 之间的记录，O(log n + k)"""
+        lo = bisect_left(self.ordinals, start_ordinal)
+        hi = bisect_right(self.ordinals, end_ordinal)
+        return self.records[lo:hi]
+
+
+# ==================== 搜索索引 ====================
+class NgramIndex:
+    """分类/备注的字符二元组倒排索引（单字关键词使用单字倒排表），
+    搜索时先求倒排表交集得到候选，再只对候选做子串校验"""
+
+    def __init__(self, records: List[Dict]):
+        self.postings = defaultdict(set)  # 字/二元组 -> {记录键}
+        self.records = {}  # 记录键 -> 记录
+        for record in records:
+            self.add(record)
+
+    @staticmethod
+    def _grams(record: Dict):
+        grams = set()
+        # 分类和备注分别切分，不产生跨字段的二元组
+        for text in (record["category"], record["remark"]):
+            grams.update(text)
+            grams.update(text[i:i + 2] for i in range(len(text) - 1))
+        return grams
+
+    def add(self, record: Dict):
+        key = id(record)
+        self.records[key] = record
+        for gram in self._grams(record):
+            self.postings[gram].add(key)
+
+    def remove(self, record: Dict):
+        key = id(record)
+        if key not in self.records:
+            return
+        for gram in self._grams(record):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.discard(key)
+                if not posting:
+                    del self.postings[gram]
+        del self.records[key]
+
+    def search(self, keyword: str) -> List[Dict]:
+        """返回分类或备注包含 keyword 的记录（按保存顺序）"""
+        if len(keyword) == 1:
+            grams = {keyword}
+        else:
+            grams = {keyword[i:i + 2] for i in range(len(keyword) - 1)}
+
+        # 从最短的倒排表开始求交集
+        postings = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+        candidates = postings[0].intersection(*postings[1:])
+
+        matched = [self.records[key] for key in candidates
+                   if keyword in self.records[key]["category"] or keyword in self.records[key]["remark"]]
+        matched.sort(key=_record_id_key)  # id 即保存顺序
+        return matched
+
+
+# ==================== 列式聚合引擎（可选，需要 NumPy） ====================
+# 记录数不少于该值时，传入记录列表的统计函数改用列式引擎（记录很少时纯 Python 更快）
+COLUMNAR_MIN_RECORDS = 2000
+
+# NumPy 为可选依赖：没有安装时统计函数全部使用纯 Python 实现。
+# 导入 NumPy 要几十毫秒，所以不在启动时导入，第一次需要列式引擎时才导入
+np = None
+_numpy_loaded = False
+
+
+def load_numpy():
+    """导入 NumPy（只尝试一次），没有安装时返回 None"""
+    global np, _numpy_loaded
+    if not _numpy_loaded:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+        _numpy_loaded = True
+    return np
+
+
+class ColumnarLedger:
+    """列式账本：金额(整数分)、日序数、年、月、分类编码各存一列，统计用 np.bincount 一次完成。
+    bincount 以 float64 累加，金额总和在 2**53 分以内都是精确整数，结果与纯 Python 统计完全一致。
+    各列是预留了空余容量的缓冲区：新增记录写入末尾空行，删除只把该行标为墓碑（金额置 0，
+    加权求和时自然不计入），墓碑过半时再整体压缩，增删都是均摊 O(1)"""
+
+    def __init__(self, records: List[Dict]):
+        self.categories = list(EXPENSE_CATEGORIES)
+        self.category_codes = {category: code for code, category in enumerate(self.categories)}
+        self.records = list(records)  # 按行存放的记录，墓碑行为 None
+        self.rows = {id(record): row for row, record in enumerate(self.records)}  # 记录对象 -> 行号
+        self.dead = 0  # 墓碑行数
+
+        ordinal_cache = {}  # 同一天的记录很多，日序数按日期字符串缓存
+        ordinals, years, months, codes, cents = [], [], [], [], []
+        for record in self.records:
+            date, month, year = record_periods(record)
+            ordinal = ordinal_cache.get(date)
+            if ordinal is None:
+                ordinal = ordinal_cache[date] = date_ordinal(date)
+            ordinals.append(ordinal)
+            years.append(int(year))
+            months.append(int(month[5:7]))
+            codes.append(self._code(record["category"]))
+            cents.append(record["cents"])
+
+        self.size = len(self.records)
+        capacity = max(16, self.size + self.size // 2)
+        self._columns = []
+        for values in (ordinals, years, months, codes, cents):
+            column = np.zeros(capacity, dtype=np.int64)
+            column[:self.size] = values
+            self._columns.append(column)
+
+    # 统计只看已使用的行（切片是视图，不复制）
+    @property
+    def ordinals(self):
+        return self._columns[0][:self.size]
+
+    @property
+    def years(self):
+        return self._columns[1][:self.size]
+
+    @property
+    def months(self):
+        return self._columns[2][:self.size]
+
+    @property
+    def codes(self):
+        return self._columns[3][:self.size]
+
+    @property
+    def cents(self):
+        return self._columns[4][:self.size]
+
+    def _code(self, category: str) -> int:
+        """分类编码（不在 EXPENSE_CATEGORIES 中的分类追加新编码）"""
+        code = self.category_codes.get(category)
+        if code is None:
+            code = self.category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+
+    def _reserve(self, capacity: int):
+        """把各列缓冲区扩容到 capacity 行（按倍数增长，摊还后追加为 O(1)）"""
+        for position, column in enumerate(self._columns):
+            grown = np.zeros(capacity, dtype=np.int64)
+            grown[:self.size] = column[:self.size]
+            self._columns[position] = grown
+
+    def add(self, record: Dict):
+        if self.size == len(self._columns[0]):
+            self._reserve(self.size * 2)
+        row = self.size
+        _, month, year = record_periods(record)
+        values = (record_ordinal(record), int(year), int(month[5:7]),
+                  self._code(record["category"]), int(record["cents"]))
+        for column, value in zip(self._columns, values):
+            column[row] = value
+        self.records.append(record)
+        self.rows[id(record)] = row
+        self.size += 1
+
+    def remove(self, record: Dict):
+        row = self.rows.pop(id(record), None)
+        if row is None:
+            return
+        self.records[row] = None
+        self._columns[4][row] = 0  # 墓碑：金额置 0，bincount 加权求和时不再计入
+        self.dead += 1
+        if self.dead * 2 > self.size:
+            self._compact()
+
+    def _compact(self):
+        """丢弃墓碑行，存活行按原顺序前移（墓碑过半时才做一次，均摊到每次删除是 O(1)）"""
+        live = [row for row in range(self.size) if self.records[row] is not None]
+        keep = np.array(live, dtype=np.int64)
+        for column in self._columns:
+            column[:len(live)] = column[keep]
+        self.records = [self.records[row] for row in live]
+        self.rows = {id(record): row for row, record in enumerate(self.records)}
+        self.size = len(live)
+        self.dead = 0
+
+    def copy(self):
+        """只读的独立副本：只复制各列已使用的部分（统计线程在锁外读取，主线程继续增量更新原账本）"""
+        clone = ColumnarLedger([])
+        clone.categories = list(self.categories)
+        clone.category_codes = dict(self.category_codes)
+        clone._columns = [column[:self.size].copy() for column in self._columns]
+        clone.size = self.size
+        return clone
+
+    def _category_mask(self, category_filter: str):
+        """分类筛选对应的布尔掩码（"总和"不筛选，返回 None）"""
+        if category_filter == "总和":
+            return None
+        code = self.category_codes.get(category_filter)
+        if code is None:
+            return np.zeros(len(self.codes), dtype=bool)
+        return self.codes == code
+
+    def _sum_by(self, keys, mask, minlength: int) -> List[int]:
+        """按整数键分组求和（键为 0..minlength-1）"""
+        if mask is not None:
+            keys = keys[mask]
+            cents = self.cents[mask]
+        else:
+            cents = self.cents
+        return np.bincount(keys, weights=cents, minlength=minlength).astype(np.int64).tolist()
+
+    def monthly_totals(self, year: int, category_filter: str) -> List[int]:
+        """某年1-12月的金额（下标0为1月）"""
+        mask = self.years == year
+        category_mask = self._category_mask(category_filter)
+        if category_mask is not None:
+            mask &= category_mask
+        return self._sum_by(self.months, mask, 13)[1:13]
+
+    def range_totals(self, keys, start: int, end: int, category_filter: str) -> List[int]:
+        """keys 列（日序数或年份）在 [start, end] 内逐个取值的金额"""
+        mask = (keys >= start) & (keys <= end)
+        category_mask = self._category_mask(category_filter)
+        if category_mask is not None:
+            mask &= category_mask
+        return self._sum_by(keys - start, mask, end - start + 1)[:end - start + 1]
+
+    def category_totals(self, start_ordinal: int = None, end_ordinal: int = None) -> Dict[str, int]:
+        """各分类的金额（可限定日期序数范围）"""
+        mask = None
+        if start_ordinal is not None:
+            mask = (self.ordinals >= start_ordinal) & (self.ordinals <= end_ordinal)
+        sums = self._sum_by(self.codes, mask, len(self.categories))
+        return {category: sums[code] for code, category in enumerate(self.categories)}
+
+
+def columnar_enabled(count: int) -> bool:
+    """count 条记录的统计是否使用列式引擎"""
+    return count >= COLUMNAR_MIN_RECORDS and load_numpy() is not None
+
+
+def columnar_ledger_for(records: List[Dict]):
+    """记录足够多且 NumPy 可用时返回列式账本，否则返回 None。
+    records 为 None 表示 json 引擎的全部记录，返回仓库列式索引的副本（统计线程在锁外计算）；
+    传入仓库中的记录列表时直接使用常驻的列式索引"""
+    if records is None:
+        if STORAGE_ENGINE != "json" or not columnar_enabled(len(record_repository.records)):
+            return None
+        return record_repository.columnar_snapshot()
+    if not columnar_enabled(len(records)):
+        return None
+    if record_repository.holds(records):
+        return record_repository.columnar
+    return ColumnarLedger(records)
+
+
+# ==================== 后台 I/O 线程 ====================
+class IOFuture:
+    """后台 I/O 的结果；回调总是通过 Clock 回到主线程执行"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._callbacks = []
+        self._result = None
+        self.error = None
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """等待并返回结果（出错时抛出原异常）"""
+        self._done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self._result
+
+    def add_done_callback(self, callback):
+        """完成后在主线程调用 callback(future)，已完成时在下一帧调用"""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        Clock.schedule_once(lambda dt: callback(self))
+
+    def _resolve(self, result, error):
+        with self._lock:
+            self._result = result
+            self.error = error
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            Clock.schedule_once(lambda dt, callback=callback: callback(self))
+
+
+class IOWorker:
+    """单个后台线程按提交顺序执行文件读写，保证保存和删除的先后顺序与界面操作一致"""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def submit(self, func, *args) -> IOFuture:
+        """把 func(*args) 放入队列，返回对应的 IOFuture"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="io-worker", daemon=True)
+            self._thread.start()
+        future = IOFuture()
+        self._queue.put((func, args, future))
+        return future
+
+    def wait_idle(self):
+        """阻塞直到队列中的操作全部执行完（切到后台、退出时使用；在 I/O 线程内调用时直接返回）"""
+        if self._thread is not None and threading.current_thread() is not self._thread:
+            self._queue.join()
+
+    def _run(self):
+        while True:
+            func, args, future = self._queue.get()
+            try:
+                future._resolve(func(*args), None)
+            except Exception as e:
+                print(f"后台I/O失败: {e}")
+                future._resolve(None, e)
+            finally:
+                self._queue.task_done()
+
+
+# 全局 I/O 线程
+io_worker = IOWorker()
+
+# 统计计算线程池（与 I/O 线程分开，统计不会排在写盘后面）
+STATS_WORKERS = 2
+_stats_executor = None
+
+
+def run_in_background(func, *args) -> IOFuture:
+    """在统计线程池中执行 func(*args)，结果同样通过 IOFuture 回到主线程"""
+    global _stats_executor
+    if _stats_executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _stats_executor = ThreadPoolExecutor(max_workers=STATS_WORKERS, thread_name_prefix="stats")
+
+    future = IOFuture()
+
+    def run():
+        try:
+            future._resolve(func(*args), None)
+        except Exception as e:
+            print(f"后台统计失败: {e}")
+            future._resolve(None, e)
+
+    _stats_executor.submit(run)
+    return future
+
+
+# ==================== 记录仓库 ====================
+def _synchronized(method):
+    """在记录仓库的锁内执行（主线程修改与统计线程读取互斥）"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class RecordRepository:
+    """进程内唯一的记录仓库：缓存解析后的记录和派生索引（汇总表、日期索引、搜索索引），
+    每次修改递增数据版本号，只有数据文件的 mtime/大小 在外部被改动时才重新读盘。
+    保存和删除先更新内存（界面立即生效），再交给 I/O 线程按顺序写盘，写盘失败时以磁盘内容为准回滚"""
+
+    def __init__(self):
+        self.lock = threading.RLock()  # 统计线程读取缓存时持有，避免读到修改了一半的索引
+        self._records = None
+        self._indexes = {}  # 派生索引，保存/删除时增量更新
+        self._rollups_dirty = False
+        self._signature = None
+        self._listeners = []  # 记录变化的监听函数 listener(op, record)，op 为 "add"、"update"、"delete"、"reload" 或 "partial"（流式加载的中间结果）
+        self._pending_writes = 0  # 已提交给 I/O 线程、主线程尚未收到结果的写入数
+        self._write_failed = False  # 有写入失败后，队列中后续的写入全部跳过，等待回滚
+        self._loading = None  # 预加载的 IOFuture（完成后清空）
+        self._partial = None  # 流式加载已发布的最新记录
+        self._next_id = 1  # 下一条新记录的 id（本次运行中只增不减，删除过的 id 不会被重新分配）
+        self.version = 0  # 数据版本号，只增不减
+
+    def add_listener(self, listener):
+        """注册记录变化的监听函数（保存/删除成功后调用）"""
+        self._listeners.append(listener)
+
+    def _notify(self, op: str, record: Dict):
+        for listener in list(self._listeners):
+            listener(op, record)
+
+    def _disk_signature(self):
+        """当前存储文件的 (路径, mtime, 大小) 签名"""
+        if STORAGE_ENGINE == "sqlite":
+            db_file = get_sqlite_file_path()
+            paths = [db_file, db_file + "-wal"]
+        elif STORAGE_ENGINE == "sharded":
+            paths = [get_shard_manifest_path()]  # 每次写入都会重写清单
+        else:
+            paths = [DATA_FILE, get_journal_file_path()]
+
+        signature = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def _ensure_fresh(self):
+        """数据文件被外部改动时丢弃所有缓存（自己的写入尚未完成时不检查）"""
+        if self._pending_writes:
+            return
+        signature = self._disk_signature()
+        if signature != self._signature:
+            self._records = None
+            self._indexes = {}
+            self._rollups_dirty = False
+            self._signature = signature
+            self.version += 1
+
+    @property
+    @_synchronized
+    def records(self) -> List[Dict]:
+        """全部记录（按保存顺序），文件未变化时直接返回内存中的列表"""
+        self._ensure_fresh()
+        if self._records is None and self._loading is not None:
+            # 预加载进行中：等它完成，不重复读盘
+            try:
+                self._loading.result()
+            except Exception:
+                pass  # 加载失败已由 I/O 线程打印，下面重新加载
+            self._install_preloaded(self._loading)
+        if self._records is None:
+            # 必须从磁盘读取时，先等排队中的写入落盘
+            self._wait_for_writes()
+            self._records = [pack_record(record) for record in load_records()]
+            # 加载时可能顺便合并了日志，以加载后的签名为准
+            self._signature = self._disk_signature()
+        return self._records
+
+    @property
+    @_synchronized
+    def rollups(self) -> RollupTables:
+        """汇总表：优先读取保存的文件，文件过期时用全部记录重建"""
+        self._ensure_fresh()
+        if "rollups" not in self._indexes:
+            self._wait_for_writes()
+            rollups = load_rollups(self._signature)
+            if rollups is None:
+                rollups = RollupTables.from_records(self.records)
+                self._rollups_dirty = True
+            self._indexes["rollups"] = rollups
+        return self._indexes["rollups"]
+
+    def rollups_snapshot(self) -> RollupTables:
+        """汇总表的副本（统计线程使用）。汇总表还不存在时在锁外用记录列表的快照读取或重建，
+        重建期间主线程的修改不用等待；数据版本没有变化时把结果安装为仓库的汇总表"""
+        with self.lock:
+            self._ensure_fresh()
+            rollups = self._indexes.get("rollups")
+            if rollups is not None:
+                return rollups.copy()
+            records, version = list(self.records), self.version
+            # 有写入还没落盘时磁盘上的汇总表文件对应不上，直接重建
+            signature = None if self._pending_writes else self._signature
+
+        rollups = load_rollups(signature) if signature is not None else None
+        rebuilt = rollups is None
+        if rebuilt:
+            rollups = RollupTables.from_records(records)
+
+        with self.lock:
+            if self.version == version and "rollups" not in self._indexes:
+                self._indexes["rollups"] = rollups
+                self._rollups_dirty = rebuilt
+                return rollups.copy()
+        # 计算期间数据已变化：结果只用于这一次统计（图表的缓存键含数据版本，会重新统计）
+        return rollups
+
+    @property
+    @_synchronized
+    def date_index(self) -> DateIndex:
+        """按日期排序的索引（首次使用时构建）"""
+        self._ensure_fresh()
+        if "date" not in self._indexes:
+            self._indexes["date"] = DateIndex(self.records)
+        return self._indexes["date"]
+
+    @property
+    @_synchronized
+    def search_index(self) -> NgramIndex:
+        """分类/备注的倒排索引（首次搜索时构建）"""
+        self._ensure_fresh()
+        if "search" not in self._indexes:
+            self._indexes["search"] = NgramIndex(self.records)
+        return self._indexes["search"]
+
+    @property
+    @_synchronized
+    def columnar(self) -> ColumnarLedger:
+        """全部记录的列式索引（需要 NumPy，首次使用时构建）"""
+        self._ensure_fresh()
+        if "columnar" not in self._indexes:
+            self._indexes["columnar"] = ColumnarLedger(self.records)
+        return self._indexes["columnar"]
+
+    def columnar_snapshot(self) -> ColumnarLedger:
+        """列式索引的副本（统计线程使用）。索引还不存在时在锁外用记录列表的快照构建，
+        构建期间主线程的修改不用等待；数据版本没有变化时把结果安装为仓库的列式索引"""
+        with self.lock:
+            self._ensure_fresh()
+            ledger = self._indexes.get("columnar")
+            if ledger is not None:
+                return ledger.copy()
+            records, version = list(self.records), self.version
+
+        ledger = ColumnarLedger(records)
+        with self.lock:
+            if self.version == version and "columnar" not in self._indexes:
+                self._indexes["columnar"] = ledger
+                return ledger.copy()
+        # 构建期间数据已变化：结果只用于这一次统计（图表的缓存键含数据版本，会重新统计）
+        return ledger
+
+    def holds(self, records: List[Dict]) -> bool:
+        """records 是否就是仓库中缓存的全部记录列表"""
+        return records is not None and records is self._records
+
+    def _allocate_id(self) -> int:
+        """新记录的 id：比存储中已有的 id 都大"""
+        if STORAGE_ENGINE == "sqlite":
+            stored_next = _sqlite_next_id()
+        elif STORAGE_ENGINE == "sharded":
+            stored_next = shard_store.next_id()
+        else:
+            records = self.records
+            stored_next = max(_json_next_id, records[-1]["id"] + 1 if records else 1)
+        # 排队中的写入还没落盘时存储里的值偏小，以内存中的计数为准
+        record_id = max(self._next_id, stored_next)
+        self._next_id = record_id + 1
+        return record_id
+
+    @_synchronized
+    def add(self, record: Dict, on_error=None):
+        """保存一条记录（分配新的 id）：立即更新缓存并通知页面，写盘交给 I/O 线程（失败时在主线程调用 on_error）"""
+        self._ensure_fresh()
+        record = pack_record(dict(record, id=self._allocate_id()))
+        if self._records is not None:
+            self._records.append(record)
+        for index in self._indexes.values():
+            index.add(record)
+        if "rollups" in self._indexes:
+            self._rollups_dirty = True
+        self.version += 1
+        _stage_write(record, 1)
+        self._submit_write(_persist_record, record, on_error)
+        self._notify("add", record)
+
+    def position_of(self, record_id: int):
+        """id 对应的记录当前在列表中的位置（记录按 id 递增排列，二分查找），找不到返回 None"""
+        return find_record_position(self.records, record_id)
+
+    def _require_position(self, record_id: int) -> int:
+        pos = self.position_of(record_id)
+        if pos is None:
+            raise KeyError(f"记录不存在: {record_id}")
+        return pos
+
+    @_synchronized
+    def update(self, record_id: int, category: str, remark: str, cents: int, on_error=None) -> Dict:
+        """修改记录的分类、备注和金额（时间和 id 不变）：立即更新缓存并通知页面，写盘交给 I/O 线程，返回修改后的记录"""
+        records = self.records
+        pos = self._require_position(record_id)
+        old_record = records[pos]
+        record = pack_record(dict(old_record, category=category, remark=remark, cents=cents))
+        records[pos] = record
+        for derived in self._indexes.values():
+            derived.remove(old_record)
+            derived.add(record)
+        if "rollups" in self._indexes:
+            self._rollups_dirty = True
+        self.version += 1
+        _stage_write(old_record, -1)
+        _stage_write(record, 1)
+        self._submit_write(_persist_update, record, on_error)
+        self._notify("update", record)
+        return record
+
+    @_synchronized
+    def delete(self, record_id: int, on_error=None) -> Dict:
+        """删除 id 对应的记录：立即更新缓存并通知页面，写盘交给 I/O 线程，返回被删除的记录"""
+        records = self.records
+        deleted_record = records.pop(self._require_position(record_id))
+        for derived in self._indexes.values():
+            derived.remove(deleted_record)
+        if "rollups" in self._indexes:
+            self._rollups_dirty = True
+        self.version += 1
+        # 按 id 写盘，与磁盘上记录的位置无关
+        _stage_write(deleted_record, -1)
+        self._submit_write(_persist_delete, deleted_record, on_error)
+        self._notify("delete", deleted_record)
+        return deleted_record
+
+    def _submit_write(self, persist, argument, on_error):
+        def write():
+            if self._write_failed:
+                raise IOError("前面的写入已失败，跳过")
+            try:
+                persist(argument)
+            except Exception:
+                self._write_failed = True
+                raise
+
+        self._pending_writes += 1
+        io_worker.submit(write).add_done_callback(
+            lambda future: self._on_write_done(future, on_error)
+        )
+
+    @_synchronized
+    def _on_write_done(self, future, on_error):
+        """写盘结果（主线程）：全部完成后更新签名；有失败时丢弃乐观修改，按磁盘内容重新加载"""
+        self._pending_writes -= 1
+        if future.error is not None and on_error is not None:
+            on_error(future.error)
+        if self._pending_writes:
+            return
+        if self._write_failed:
+            self._write_failed = False
+            print("写入失败，已按磁盘上的数据回滚")
+            if STORAGE_ENGINE == "sharded":
+                shard_store.discard_pending()  # 失败后被跳过的写入不会注销自己登记的修改
+            self.invalidate()
+            self._notify("reload", None)
+        else:
+            self._signature = self._disk_signature()
+
+    def _wait_for_writes(self):
+        """等待 I/O 线程把排队的写入全部执行完，并以写入后的文件签名为准"""
+        if self._pending_writes:
+            io_worker.wait_idle()
+            if not self._write_failed:
+                self._signature = self._disk_signature()
+
+    def preload(self):
+        """在 I/O 线程中提前加载记录，页面第一次读取时不必等待磁盘"""
+        if self._records is not None or self._loading is not None:
+            return
+        if STORAGE_ENGINE == "sharded":
+            # 分片引擎：只预读清单和当月分片，记录页第一次打开时再加载全部月份
+            io_worker.submit(shard_store.shard, datetime.now().strftime("%Y-%m"))
+            return
+
+        if STORAGE_ENGINE == "json" and STREAM_LOADING:
+            load = self._stream_load
+        else:
+            def load():
+                records = [pack_record(record) for record in load_records()]
+                return records, self._disk_signature()
+
+        self._loading = io_worker.submit(load)
+        self._loading.add_done_callback(self._install_preloaded)
+
+    def _stream_load(self):
+        """I/O 线程：流式加载快照和日志，最新的记录分批发布到主线程，返回 (全部记录, 签名)"""
+        init_data()
+        entries = _read_journal()
+        for entry in entries:
+            if entry["op"] in ("add", "update"):
+                entry["record"] = pack_record(entry["record"])
+        # 删除和修改要对照完整列表，日志中有这两种操作时不发布中间结果
+        journal_adds = [entry["record"] for entry in entries if entry["op"] == "add"]
+        preview = all(entry["op"] == "add" for entry in entries)
+
+        newest_first = []
+        next_publish = STREAM_FIRST_BATCH
+        for record in iter_snapshot_newest_first(DATA_FILE):
+            newest_first.append(pack_record(record))
+            if preview and len(newest_first) >= next_publish:
+                recent = newest_first[::-1] + journal_adds
+                Clock.schedule_once(lambda dt, recent=recent: self._install_partial(recent))
+                next_publish *= STREAM_BATCH_GROWTH
+
+        newest_first.reverse()
+        records = _replay_journal(newest_first, entries)
+        _note_json_next_id(records, entries)
+        _finish_json_load(records)
+        return records, self._disk_signature()
+
+    @_synchronized
+    def _install_partial(self, recent: List[Dict]):
+        """主线程收到流式加载的中间结果（最近的记录，按保存顺序）"""
+        if self._records is None and self._loading is not None:
+            self._partial = recent
+            self._notify("partial", None)
+
+    @_synchronized
+    def _install_preloaded(self, future):
+        """主线程收到预加载结果：页面还没读取过记录时直接使用；显示过中间结果时通知页面刷新"""
+        if future is not self._loading:
+            return
+        self._loading = None
+        partial_shown, self._partial = self._partial is not None, None
+        if future.error is None and self._records is None and not self._pending_writes:
+            records, signature = future.result()
+            # 加载期间文件被改动过时丢弃结果，下次读取时重新加载
+            if signature == self._disk_signature():
+                self._ensure_fresh()
+                if self._records is None and signature == self._signature:
+                    self._records = records
+        if partial_shown:
+            # 下一帧再通知，避免在读取 records 的过程中重入页面刷新
+            Clock.schedule_once(lambda dt: self._notify("reload", None))
+
+    @property
+    def loading(self) -> bool:
+        """启动时的预加载是否还在进行"""
+        return self._records is None and self._loading is not None
+
+    def recent_records(self) -> List[Dict]:
+        """页面首屏用的记录：预加载进行中时返回已解析出的最新记录（可能为空），不等待加载完成"""
+        if self.loading:
+            return self._partial or []
+        return self.records
+
+    @_synchronized
+    def rebuild_rollups(self) -> bool:
+        """用全部记录重建汇总表（一致性检查），返回原汇总表是否与重建结果一致"""
+        rebuilt = RollupTables.from_records(self.records)
+        current = self._indexes.get("rollups")
+        consistent = current is None or current == rebuilt
+        if not consistent:
+            print("汇总表与原始记录不一致，已重建")
+        self._indexes["rollups"] = rebuilt
+        self._rollups_dirty = True
+        return consistent
+
+    @_synchronized
+    def flush(self):
+        """等待排队的写入完成，再把有变化的汇总表写到数据文件旁边"""
+        self._wait_for_writes()
+        rollups = self._indexes.get("rollups")
+        if rollups is not None and self._rollups_dirty:
+            if self._disk_signature() == self._signature and save_rollups(rollups, self._signature):
+                self._rollups_dirty = False
+
+    @_synchronized
+    def invalidate(self):
+        """丢弃缓存，下次读取时重新加载"""
+        self._signature = None
+        self._ensure_fresh()
+
+
+# 全局记录仓库
+record_repository = RecordRepository()
+
+
+@profiled()
+def save_record(category: str, remark: str, amount: float, on_error=None) -> bool:
+    """保存支出记录（强制UTF-8编码）；写盘在后台完成，失败时回滚并在主线程调用 on_error(异常)"""
     try:
-        records = load_records()
         current_time = datetime.now()
         record = {
             "time": current_time.strftime("%Y-%m-%d %H:%M"),
@@ -151,49 +2262,139 @@ def save_record(category: str, remark: str, amount: float) -> bool:
             "year": current_time.strftime("%Y"),
             "category": category,
             "remark": remark,
-            "amount": round(float(amount), 2)
+            "cents": to_cents(amount)
         }
-        records.append(record)
-        # 关键：ensure_ascii=False 保留中文，encoding='utf-8' 确保编码正确
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(records, f, ensure_ascii=False, indent=2)
+        record_repository.add(record, on_error)
         return True
     except Exception as e:
         print(f"保存记录失败: {e}")
         return False
 
 
-def filter_records_by_time(records: List[Dict], filter_type: str, target_value: str = "") -> List[Dict]:
-    """按时间筛选记录"""
+@profiled()
+def update_record(record_id: int, category: str, remark: str, amount: float, on_error=None) -> bool:
+    """修改 id 对应记录的分类、备注和金额；写盘在后台完成，失败时回滚并在主线程调用 on_error(异常)"""
+    try:
+        record_repository.update(record_id, category, remark, to_cents(amount), on_error)
+        return True
+    except Exception as e:
+        print(f"修改记录失败: {e}")
+        return False
+
+
+@profiled()
+def delete_record(record_id: int, on_error=None) -> bool:
+    """删除 id 对应的记录；写盘在后台完成，失败时回滚并在主线程调用 on_error(异常)"""
+    try:
+        record_repository.delete(record_id, on_error)
+        return True
+    except Exception as e:
+        print(f"删除记录失败: {e}")
+        return False
+
+
+def _time_filter_condition(filter_type: str, target_value: str = ""):
+    """把时间筛选类型转换为 (字段名, 值)，返回 None 表示不筛选"""
+    now = datetime.now()
     if filter_type == "今日":
-        today = datetime.now().strftime("%Y-%m-%d")
-        return [r for r in records if r["date"] == today]
+        return "date", now.strftime("%Y-%m-%d")
     elif filter_type == "本月":
-        current_month = datetime.now().strftime("%Y-%m")
-        return [r for r in records if r["month"] == current_month]
+        return "month", now.strftime("%Y-%m")
     elif filter_type == "本年":
-        current_year = datetime.now().strftime("%Y")
-        return [r for r in records if r["year"] == current_year]
+        return "year", now.strftime("%Y")
     elif filter_type == "自定义日期":
         # target_value 应该是 YYYY-MM-DD 格式的字符串
-        if target_value:
-            return [r for r in records if r["date"] == target_value]
-        return records
-    elif filter_type == "按月统计":
-        if target_value:
-            return [r for r in records if r["month"] == target_value]
-        return records
+        return ("date", target_value) if target_value else None
+    elif filter_type in ("按月统计", "自定义月份"):
+        # target_value 应该是 YYYY-MM 格式的字符串
+        return ("month", target_value) if target_value else None
+    elif filter_type == "自定义年份":
+        return ("year", target_value) if target_value else None
+    return None
+
+
+def _time_filter_range(filter_type: str, target_value: str = ""):
+    """把时间筛选类型转换为日期序数闭区间 (起, 止)，返回 None 表示不筛选"""
+    condition = _time_filter_condition(filter_type, target_value)
+    if condition is None:
+        return None
+
+    field, value = condition
+    if field == "date":
+        start = end = date_ordinal(value)
+    elif field == "month":
+        year, month = int(value[:4]), int(value[5:7])
+        start = datetime(year, month, 1).toordinal()
+        end = (datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)).toordinal() - 1
     else:
+        year = int(value)
+        start = datetime(year, 1, 1).toordinal()
+        end = datetime(year, 12, 31).toordinal()
+    return start, end
+
+
+def filter_records_by_time(records: List[Dict], filter_type: str, target_value: str = "") -> List[Dict]:
+    """按时间筛选记录（records 为 None 时直接查询存储引擎或日期索引）"""
+    if records is None and STORAGE_ENGINE == "sqlite":
+        return _sqlite_select(_sqlite_time_conditions(filter_type, target_value))
+    if records is None and STORAGE_ENGINE == "sharded":
+        return shard_store.filter_records(filter_type, target_value)
+    if records is None:
+        try:
+            date_range = _time_filter_range(filter_type, target_value)
+        except ValueError:
+            # 年月日不合法时不可能有匹配的记录
+            return []
+        if date_range is None:
+            return record_repository.records
+        return record_repository.date_index.range(*date_range)
+
+    condition = _time_filter_condition(filter_type, target_value)
+    if condition is None:
         return records
+    field, value = condition
+    if RECORD_LAYOUT == "dict":
+        return [r for r in records if r[field] == value]
+    # 紧凑记录按时间戳比较，不必推导日期字符串（个别无法紧凑表示的记录仍是字典）
+    try:
+        start, end = _time_filter_range(filter_type, target_value)
+    except ValueError:
+        return []
+    low, high = start * MINUTES_PER_DAY, (end + 1) * MINUTES_PER_DAY
+    return [r for r in records
+            if (low <= r.minutes < high if type(r) is CompactRecord else r[field] == value)]
+
+
+def filter_records_by_date_range(records: List[Dict], start_date: str, end_date: str) -> List[Dict]:
+    """筛选 start_date ~ end_date（YYYY-MM-DD，含两端）之间的记录，records 为 None 时走索引。
+    界面目前没有调用（供脚本和导出使用）；日期不合法时返回空列表，与 filter_records_by_time 一致"""
+    try:
+        start, end = date_ordinal(start_date), date_ordinal(end_date)
+    except ValueError:
+        # 年月日不合法时不可能有匹配的记录
+        return []
+    if records is None and STORAGE_ENGINE == "sqlite":
+        return _sqlite_select([("date >= ?", start_date), ("date <= ?", end_date)])
+    if records is None and STORAGE_ENGINE == "sharded":
+        return shard_store.records_between(start_date, end_date)
+    if records is None:
+        return record_repository.date_index.range(start, end)
+    return [r for r in records if start_date <= record_periods(r)[0] <= end_date]
 
 
 def search_records(records: List[Dict], keyword: str) -> List[Dict]:
-    """模糊搜索记录（匹配分类/备注，支持中文）"""
+    """模糊搜索记录（匹配分类/备注，支持中文；records 为 None 时使用倒排索引）"""
     if not keyword:
-        return records
+        return record_repository.records if records is None else records
 
     # 中文不区分大小写，直接匹配原字符
     keyword = keyword.strip()
+    if records is None:
+        # 全部记录：走倒排索引，只校验候选记录
+        if not keyword:
+            return record_repository.records
+        return record_repository.search_index.search(keyword)
+
     matched = []
     for record in records:
         if (keyword in record["category"]) or (keyword in record["remark"]):
@@ -201,31 +2402,81 @@ def search_records(records: List[Dict], keyword: str) -> List[Dict]:
     return matched
 
 
-def calculate_total(records: List[Dict]) -> float:
-    """计算记录总金额"""
-    total = sum([record["amount"] for record in records])
-    return round(total, 2)
-
-
-def get_monthly_statistics(records: List[Dict], category_filter: str):
-    """获取月度统计数据（只统计当前年份）"""
-    # 首先根据分类过滤数据
+def calculate_total(records: List[Dict]) -> int:
+    """计算记录总金额（整数分）"""
+    return sum([record["cents"] for record in records])
+
+
+def _rollup_category_totals(filter_type: str, target_value: str = "", rollups: RollupTables = None) -> Dict[str, int]:
+    """从汇总表（默认为仓库的汇总表）读取某个时间筛选范围内各分类的金额（不访问原始记录）"""
+    if rollups is None:
+        rollups = record_repository.rollups
+    condition = _time_filter_condition(filter_type, target_value)
+    if condition is not None:
+        field, value = condition
+        level = {field: level for level, field in ROLLUP_LEVELS.items()}[field]
+        return rollups.category_totals(level, value)
+
+    # 不筛选时间：累加所有年份
+    category_totals = defaultdict(int)
+    for totals in rollups.tables["year"].values():
+        for category, amount in totals.items():
+            category_totals[category] += amount
+    return category_totals
+
+
+@profiled()
+def calculate_total_by_time(records: List[Dict], filter_type: str, target_value: str = "") -> int:
+    """按时间筛选并计算总金额（整数分；records 为 None 时由数据库或汇总表直接给出）"""
+    if records is None and STORAGE_ENGINE == "sqlite":
+        where, params = _sqlite_where(_sqlite_time_conditions(filter_type, target_value))
+        return _get_sqlite_connection().execute(
+            "SELECT COALESCE(SUM(cents), 0) FROM records" + where, params
+        ).fetchone()[0]
+    if records is None and STORAGE_ENGINE == "sharded":
+        return sum(shard_store.category_totals(filter_type, target_value).values())
+    if records is None:
+        return sum(_rollup_category_totals(filter_type, target_value).values())
+    return calculate_total(filter_records_by_time(records, filter_type, target_value))
+
+
+def _filter_by_category(records: List[Dict], category_filter: str) -> List[Dict]:
+    """根据分类过滤数据（"总和"表示不过滤）"""
     if category_filter != "总和":
-        filtered_records = [r for r in records if r["category"] == category_filter]
-    else:
-        filtered_records = records
+        return [r for r in records if r["category"] == category_filter]
+    return records
 
+
+@profiled()
+def get_monthly_statistics(records: List[Dict], category_filter: str, rollups: RollupTables = None):
+    """获取月度统计数据（只统计当前年份；rollups 为统计线程取得的汇总表副本，给出时不使用列式引擎）"""
     # 获取当前年份
     current_year = datetime.now().year
 
-    # 按月份聚合数据
-    monthly_totals = defaultdict(float)
-
-    for record in filtered_records:
-        # 只统计当前年份的数据
-        if record["year"] == str(current_year):
-            month = record["month"].split("-")[1]  # 获取月份部分（MM）
-            monthly_totals[int(month)] += record["amount"]
+    # 按月份聚合数据（记录很多时用列式引擎）
+    monthly_totals = defaultdict(int)
+    ledger = columnar_ledger_for(records) if rollups is None else None
+
+    if records is None and STORAGE_ENGINE == "sqlite":
+        for month, amount in _sqlite_group_sum("month", [("year = ?", str(current_year))], category_filter):
+            monthly_totals[int(month.split("-")[1])] = amount
+    elif records is None and STORAGE_ENGINE == "sharded":
+        for month in range(1, 13):
+            monthly_totals[month] = shard_store.period_total(f"{current_year}-{month:02d}", category_filter)
+    elif ledger is not None:
+        totals = ledger.monthly_totals(current_year, category_filter)
+        for month, amount in enumerate(totals, start=1):
+            monthly_totals[month] = amount
+    elif records is None:
+        rollups = rollups if rollups is not None else record_repository.rollups
+        for month in range(1, 13):
+            monthly_totals[month] = rollups.total("month", f"{current_year}-{month:02d}", category_filter)
+    else:
+        for record in _filter_by_category(records, category_filter):
+            # 只统计当前年份的数据
+            if record["year"] == str(current_year):
+                month = record["month"].split("-")[1]  # 获取月份部分（MM）
+                monthly_totals[int(month)] += record["cents"]
 
     # 返回1-12月的数据，如果没有数据则为0
     result = []
@@ -235,58 +2486,76 @@ def get_monthly_statistics(records: List[Dict], category_filter: str):
     return result
 
 
-def get_daily_statistics(records: List[Dict], category_filter: str):
-    """获取每日统计数据（最近20天）"""
-    # 首先根据分类过滤数据
-    if category_filter != "总和":
-        filtered_records = [r for r in records if r["category"] == category_filter]
-    else:
-        filtered_records = records
-
-    # 计算最近20天的日期
-    daily_totals = defaultdict(float)
-    for i in range(20):  # 修改为20天
-        day_ago = datetime.now() - timedelta(days=i)
-        day_str = day_ago.strftime("%m-%d")
-        daily_totals[day_str] = 0.0
+@profiled()
+def get_daily_statistics(records: List[Dict], category_filter: str, rollups: RollupTables = None):
+    """获取每日统计数据（最近20天；rollups 为统计线程取得的汇总表副本，给出时不使用列式引擎）"""
+    # 计算最近20天的日期（按完整日期聚合，避免把往年同月同日的记录算进来）
+    now = datetime.now()
+    days = [(now - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(20)]  # 修改为20天
+    daily_totals = {day: 0 for day in days}
+    ledger = columnar_ledger_for(records) if rollups is None else None
 
     # 聚合数据
-    for record in filtered_records:
-        date = record["date"]
-        date_part = date.split("-")[1] + "-" + date.split("-")[2]  # MM-DD
-        if date_part in daily_totals:
-            daily_totals[date_part] += record["amount"]
-
-    # 生成结果，从最近一天开始
-    result = []
-    for i in range(20):  # 修改为20天
-        day_ago = datetime.now() - timedelta(days=i)
-        day_str = day_ago.strftime("%m-%d")
-        result.append((f"{day_str}", daily_totals[day_str]))
-
-    return result
+    if records is None and STORAGE_ENGINE == "sqlite":
+        conditions = [("date >= ?", days[-1]), ("date <= ?", days[0])]
+        for date, amount in _sqlite_group_sum("date", conditions, category_filter):
+            daily_totals[date] = amount
+    elif records is None and STORAGE_ENGINE == "sharded":
+        # 最近20天最多跨两个月，只加载这两个分片
+        for record in _filter_by_category(shard_store.records_between(days[-1], days[0]), category_filter):
+            daily_totals[record["date"]] += record["cents"]
+    elif ledger is not None:
+        start = date_ordinal(days[-1])
+        totals = ledger.range_totals(ledger.ordinals, start, date_ordinal(days[0]), category_filter)
+        for day in days:
+            daily_totals[day] = totals[date_ordinal(day) - start]
+    elif records is None:
+        rollups = rollups if rollups is not None else record_repository.rollups
+        for day in days:
+            daily_totals[day] = rollups.total("day", day, category_filter)
+    else:
+        for record in _filter_by_category(records, category_filter):
+            date = record["date"]
+            if date in daily_totals:
+                daily_totals[date] += record["cents"]
 
+    # 生成结果，从最近一天开始（显示为 MM-DD；范围跨年时显示完整日期，以免两年的日期看不出先后）
+    label_start = 5 if days[0][:4] == days[-1][:4] else 0
+    return [(day[label_start:], daily_totals[day]) for day in days]
 
-def get_yearly_statistics(records: List[Dict], category_filter: str):
-    """获取年度统计数据（最近10年）"""
-    # 首先根据分类过滤数据
-    if category_filter != "总和":
-        filtered_records = [r for r in records if r["category"] == category_filter]
-    else:
-        filtered_records = records
 
+@profiled()
+def get_yearly_statistics(records: List[Dict], category_filter: str, rollups: RollupTables = None):
+    """获取年度统计数据（最近10年；rollups 为统计线程取得的汇总表副本，给出时不使用列式引擎）"""
     # 计算最近10年的年份
     current_year = datetime.now().year
     yearly_totals = {}
     for i in range(10):
         year = current_year - i
-        yearly_totals[str(year)] = 0.0
+        yearly_totals[str(year)] = 0
+    ledger = columnar_ledger_for(records) if rollups is None else None
 
     # 聚合数据
-    for record in filtered_records:
-        year = record["year"]
-        if year in yearly_totals:
-            yearly_totals[year] += record["amount"]
+    if records is None and STORAGE_ENGINE == "sqlite":
+        conditions = [("year >= ?", str(current_year - 9)), ("year <= ?", str(current_year))]
+        for year, amount in _sqlite_group_sum("year", conditions, category_filter):
+            yearly_totals[year] = amount
+    elif records is None and STORAGE_ENGINE == "sharded":
+        for year in yearly_totals:
+            yearly_totals[year] = shard_store.period_total(year, category_filter)
+    elif ledger is not None:
+        totals = ledger.range_totals(ledger.years, current_year - 9, current_year, category_filter)
+        for i, amount in enumerate(totals):
+            yearly_totals[str(current_year - 9 + i)] = amount
+    elif records is None:
+        rollups = rollups if rollups is not None else record_repository.rollups
+        for year in yearly_totals:
+            yearly_totals[year] = rollups.total("year", year, category_filter)
+    else:
+        for record in _filter_by_category(records, category_filter):
+            year = record["year"]
+            if year in yearly_totals:
+                yearly_totals[year] += record["cents"]
 
     # 生成结果，从最近一年开始
     result = []
@@ -297,6 +2566,90 @@ def get_yearly_statistics(records: List[Dict], category_filter: str):
     return result
 
 
+@profiled()
+def get_category_totals(records: List[Dict], filter_type: str, target_value: str = "",
+                        rollups: RollupTables = None) -> Dict[str, int]:
+    """按时间筛选后汇总各分类金额（整数分；records 为 None 时由数据库或汇总表直接给出）"""
+    category_totals = {category: 0 for category in EXPENSE_CATEGORIES}
+    if records is None and STORAGE_ENGINE == "sqlite":
+        for category, amount in _sqlite_group_sum("category", _sqlite_time_conditions(filter_type, target_value)):
+            if category in category_totals:
+                category_totals[category] = amount
+        return category_totals
+    ledger = columnar_ledger_for(records) if rollups is None else None
+    if records is None and ledger is None:
+        if STORAGE_ENGINE == "sharded":
+            totals = shard_store.category_totals(filter_type, target_value)
+        else:
+            totals = _rollup_category_totals(filter_type, target_value, rollups)
+        for category, amount in totals.items():
+            if category in category_totals:
+                category_totals[category] = amount
+        return category_totals
+
+    if ledger is not None:
+        try:
+            date_range = _time_filter_range(filter_type, target_value)
+        except ValueError:
+            # 年月日不合法时不可能有匹配的记录
+            return category_totals
+        totals = ledger.category_totals(*date_range) if date_range else ledger.category_totals()
+        for category in category_totals:
+            category_totals[category] = totals[category]
+        return category_totals
+
+    for record in filter_records_by_time(records, filter_type, target_value):
+        category = record["category"]
+        if category in category_totals:
+            category_totals[category] += record["cents"]
+    return category_totals
+
+
+def build_category_distribution(category_totals: Dict[str, int]):
+    """根据各分类金额（整数分）计算扇形图数据"""
+    # 计算总金额
+    total_amount = sum(category_totals.get(category, 0) for category in EXPENSE_CATEGORIES)
+
+    # 只返回有金额的分类，过滤掉金额为0的分类
+    distribution = []
+    for category in EXPENSE_CATEGORIES:
+        cents = category_totals.get(category, 0)
+        if cents > 0:  # 只添加有金额的分类
+            percentage = (cents / total_amount * 100) if total_amount > 0 else 0
+            angle = (cents / total_amount * 360) if total_amount > 0 else 0
+            distribution.append({
+                "category": category,
+                "cents": cents,
+                "percentage": percentage,
+                "angle": angle
+            })
+
+    return distribution, total_amount
+
+
+@profiled()
+def calculate_category_distribution(records: List[Dict]):
+    """计算各分类的分布情况"""
+    # 初始化所有分类的金额为0
+    category_totals = {category: 0 for category in EXPENSE_CATEGORIES}
+
+    # 记录很多时用列式引擎一次求和
+    ledger = columnar_ledger_for(records)
+    if ledger is not None:
+        totals = ledger.category_totals()
+        for category in category_totals:
+            category_totals[category] = totals[category]
+        return build_category_distribution(category_totals)
+
+    # 计算每个分类的总金额
+    for record in records:
+        category = record["category"]
+        if category in category_totals:
+            category_totals[category] += record["cents"]
+
+    return build_category_distribution(category_totals)
+
+
 # 自定义按钮类
 class StyledButton(Button):
     def __init__(self, **kwargs):
@@ -312,45 +2665,116 @@ class StyledButton(Button):
         self.rect.size = self.size
 
 
-# 自定义柱状图组件
+# 自定义柱状图组件：尺寸/位置变化合并为每帧一次重绘，标签和绘制指令复用而不是重建
 class BarChartWidget(FloatLayout):
     def __init__(self, data=[], **kwargs):
         super().__init__(**kwargs)
         self.data = data
-        self.bind(size=self.draw_chart, pos=self.draw_chart)
+        self.bars = []  # 复用的柱子：[(InstructionGroup, 柱子, 边框, 连接线, 金额标签, 时间标签)]
+        self.visible_bars = 0  # 池中前 visible_bars 个柱子在画布上
+
+        # 图表背景和年份标签只创建一次
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            self.background = Rectangle()
+        self.year_label = Label(
+            font_size=SMALL_CONTENT_FONT_SIZE,
+            size_hint=(None, None),
+            width=100,
+            height=30,
+            halign='center',
+            font_name=DEFAULT_FONT,
+            color=TEXT_COLOR
+        )
+        self.no_data_label = Label(
+            text="暂无统计数据",
+            font_size=SMALL_CONTENT_FONT_SIZE,
+            color=TEXT_COLOR,
+            halign="center",
+            valign="middle",
+            font_name=DEFAULT_FONT
+        )
+
+        # 同一帧内的多次 size/pos 变化只触发一次重绘
+        self.redraw_trigger = Clock.create_trigger(self.draw_chart)
+        self.bind(size=self.redraw_trigger, pos=self.redraw_trigger)
         self.draw_chart()
 
-    def draw_chart(self, *args):
-        # 清除之前的绘制
-        self.canvas.clear()
+    def _acquire_bars(self, count: int):
+        """从池中取出 count 个柱子（不够时新建），多余的从画布和控件树中移除"""
+        while len(self.bars) < count:
+            group = InstructionGroup()
+            group.add(Color(0.98, 0.85, 0.9, 1))  # 使用主色调
+            bar = Rectangle()
+            group.add(bar)
+            # 柱子边框
+            group.add(Color(0.98, 0.85, 0.9, 1))
+            border = Line(width=1)
+            group.add(border)
+            # Y轴标签线（连接时间标签和柱子）
+            group.add(Color(0.5, 0.5, 0.5, 1))
+            connector = Line(width=1)
+            group.add(connector)
+
+            # 金额标签（柱子右侧）和时间标签（固定在最左边）
+            amount_label = Label(
+                font_size=SMALL_CONTENT_FONT_SIZE - 7,  # 与月份标签字体大小相同
+                size_hint=(None, None),
+                width=100,
+                halign='left',
+                font_name=DEFAULT_FONT,
+                color=TEXT_COLOR
+            )
+            time_label = Label(
+                font_size=SMALL_CONTENT_FONT_SIZE - 7,  # 月份标签字体大小
+                size_hint=(None, None),
+                width=120,
+                halign='right',
+                shorten=True,
+                font_name=DEFAULT_FONT,
+                color=TEXT_COLOR
+            )
+            self.bars.append((group, bar, border, connector, amount_label, time_label))
+
+        for group, _, _, _, amount_label, time_label in self.bars[self.visible_bars:count]:
+            self.canvas.add(group)
+            self.add_widget(amount_label)
+            self.add_widget(time_label)
+        for group, _, _, _, amount_label, time_label in self.bars[count:self.visible_bars]:
+            self.canvas.remove(group)
+            self.remove_widget(amount_label)
+            self.remove_widget(time_label)
+        self.visible_bars = count
+        return self.bars[:count]
+
+    def _show_label(self, label: Label, visible: bool):
+        if visible and label.parent is None:
+            self.add_widget(label)
+        elif not visible and label.parent is not None:
+            self.remove_widget(label)
 
-        # 移除之前添加的所有标签
-        for child in list(self.children):
-            if isinstance(child, Label):
-                self.remove_widget(child)
+    @profiled()
+    def draw_chart(self, *args):
+        """按当前尺寸更新复用的柱子和标签（只修改位置、大小和文字）"""
+        bars = self._acquire_bars(len(self.data))
+        self._show_label(self.no_data_label, not self.data)
+        self._show_label(self.year_label, bool(self.data))
 
         if not self.data:
             # 显示无数据提示
-            no_data_label = Label(
-                text="暂无统计数据",
-                font_size=SMALL_CONTENT_FONT_SIZE,
-                color=TEXT_COLOR,
-                halign="center",
-                valign="middle",
-                center_x=self.center_x,
-                center_y=self.center_y,
-                font_name=DEFAULT_FONT
-            )
-            self.add_widget(no_data_label)
+            self.background.size = (0, 0)
+            self.no_data_label.center = self.center
             return
 
         # 获取最大值用于缩放
-        max_amount = max([item[1] for item in self.data]) if self.data else 1
+        max_amount = max([item[1] for item in self.data])
         if max_amount == 0:
             max_amount = 1
 
         # 设置图表区域 - 使用整个组件的空间，并留出适当边距
-        margin_left = 150  # 左边距，为月份标签预留空间
+        # 时间标签列的宽度：跨年的每日统计显示完整日期，比 MM-DD、月份、年份长，需要更宽的一列
+        label_width = 120 if max(len(item[0]) for item in self.data) <= 5 else 220
+        margin_left = label_width + 30  # 左边距，为时间标签预留空间
         margin_right = 150  # 右边距
         margin_top = 50  # 上边距
         margin_bottom = 80  # 下边距，为年份标签预留空间
@@ -362,92 +2786,47 @@ class BarChartWidget(FloatLayout):
         chart_width = chart_right - chart_left
         chart_height = chart_top - chart_bottom
 
-        # 绘制背景
-        with self.canvas:
-            Color(1, 1, 1, 1)
-            Rectangle(pos=(chart_left, chart_bottom), size=(chart_width, chart_height))
-
-            # # 绘制网格线（垂直线）
-            # Color(0.9, 0.9, 0.9, 1)
-            # for i in range(5):
-            #     x_pos = chart_left + (chart_width / 4) * i
-            #     Line(points=[x_pos, chart_bottom, x_pos, chart_top], width=1)
+        # 背景
+        self.background.pos = (chart_left, chart_bottom)
+        self.background.size = (chart_width, chart_height)
 
-        # 绘制水平柱状图
+        # 水平柱状图：计算柱子高度，确保所有柱子都能完整显示
         num_bars = len(self.data)
-        if num_bars > 0:
-            # 计算柱子高度，确保所有柱子都能完整显示
-            bar_height = chart_height / num_bars * 0.8  # 每个柱子占用80%的分配空间
-            space_between_bars = chart_height / num_bars * 0.2  # 柱子之间的间距
-
-            for i, (time_period, amount) in enumerate(self.data):
-                bar_width = (amount / max_amount) * chart_width * 0.9  # 水平方向的宽度
-                bar_x = chart_left  # 从左边开始
-                # 从上到下排列，注意索引顺序
-                bar_y = chart_bottom + chart_height - (i + 1) * (
-                        bar_height + space_between_bars) + space_between_bars / 2
-
-                # 绘制柱子
-                with self.canvas:
-                    Color(0.98, 0.85, 0.9, 1)  # 使用主色调
-                    Rectangle(pos=(bar_x, bar_y), size=(bar_width, bar_height))
-
-                    # 绘制柱子边框
-                    Color(0.98, 0.85, 0.9, 1)
-                    Line(rectangle=(bar_x, bar_y, bar_width, bar_height), width=1)
-
-                # 创建标签显示金额（在柱子右侧）
-                amount_label = Label(
-                    text=f"{amount:.2f}元",
-                    font_size=SMALL_CONTENT_FONT_SIZE - 7,  # 与月份标签字体大小相同
-                    size_hint=(None, None),
-                    width=100,
-                    height=min(bar_height, 60),
-                    halign='left',
-                    font_name=DEFAULT_FONT,
-                    color=TEXT_COLOR
-                )
-                amount_label.x = bar_x + bar_width + 40
-                amount_label.center_y = bar_y + bar_height / 2
-                self.add_widget(amount_label)
-
-                # 创建标签显示时间（在柱子左侧，固定在最左边）
-                time_label = Label(
-                    text=time_period,
-                    font_size=SMALL_CONTENT_FONT_SIZE - 7,  # 月份标签字体大小
-                    size_hint=(None, None),
-                    width=120,
-                    height=min(bar_height, 60),
-                    halign='right',
-                    shorten=True,
-                    text_size=(120, min(bar_height, 60)),
-                    font_name=DEFAULT_FONT,
-                    color=TEXT_COLOR
-                )
-                time_label.x = self.x + 10  # 固定在最左边，而不是柱子的左边
-                time_label.center_y = bar_y + bar_height / 2
-                self.add_widget(time_label)
-
-                # 绘制Y轴标签线（连接月份标签和柱子）
-                with self.canvas:
-                    Color(0.5, 0.5, 0.5, 1)
-                    Line(points=[time_label.right, time_label.center_y, bar_x, bar_y + bar_height / 2], width=1)
-
-            # 添加当前年份显示
-            current_year = datetime.now().year
-            year_label = Label(
-                text=f"{current_year}年",
-                font_size=SMALL_CONTENT_FONT_SIZE,
-                size_hint=(None, None),
-                width=100,
-                height=30,
-                halign='center',
-                font_name=DEFAULT_FONT,
-                color=TEXT_COLOR
-            )
-            year_label.center_x = self.center_x
-            year_label.y = self.y + 20  # 在底部边缘上方
-            self.add_widget(year_label)
+        bar_height = chart_height / num_bars * 0.8  # 每个柱子占用80%的分配空间
+        space_between_bars = chart_height / num_bars * 0.2  # 柱子之间的间距
+        label_height = min(bar_height, 60)
+
+        for i, (time_period, amount) in enumerate(self.data):
+            _, bar, border, connector, amount_label, time_label = bars[i]
+            bar_width = (amount / max_amount) * chart_width * 0.9  # 水平方向的宽度
+            bar_x = chart_left  # 从左边开始
+            # 从上到下排列，注意索引顺序
+            bar_y = chart_bottom + chart_height - (i + 1) * (
+                    bar_height + space_between_bars) + space_between_bars / 2
+            bar_center_y = bar_y + bar_height / 2
+
+            bar.pos = (bar_x, bar_y)
+            bar.size = (bar_width, bar_height)
+            border.rectangle = (bar_x, bar_y, bar_width, bar_height)
+
+            amount_label.text = f"{format_money(amount)}元"
+            amount_label.height = label_height
+            amount_label.x = bar_x + bar_width + 40
+            amount_label.center_y = bar_center_y
+
+            time_label.text = time_period
+            time_label.height = label_height
+            time_label.width = label_width
+            time_label.text_size = (label_width, label_height)
+            time_label.x = self.x + 10  # 固定在最左边，而不是柱子的左边
+            time_label.center_y = bar_center_y
+
+            connector.points = [time_label.right, bar_center_y, bar_x, bar_center_y]
+
+        # 当前年份显示（在底部边缘上方）
+        self.year_label.text = f"{datetime.now().year}年"
+        self.year_label.center_x = self.center_x
+        self.year_label.y = self.y + 20
 
 
 # 第一页：记账输入页面（优化版）- 移除白色背景边框
@@ -470,9 +2849,6 @@ class InputPage(BoxLayout):
         input_layout.size_hint_y = 1
         self.add_widget(input_layout)
 
-        # 初始化加载记录
-        self.current_records = load_records()
-
     def create_input_section(self):
         # 创建普通布局 - 移除白色背景边框
         card_layout = BoxLayout(orientation='vertical', padding=20)  # 增加内边距
@@ -668,22 +3044,28 @@ class InputPage(BoxLayout):
     def save_record_handler(self, instance):
         """保存支出记录处理"""
         amount_text = self.amount_input.text.strip()
-        if not amount_text or float(amount_text) <= 0:
+        if parse_amount(amount_text) is None:
             self.result_label.text = "错误：金额必须是大于0的数字！"
             self.result_label.color = ERROR_COLOR
             return
 
         category = self.category_spinner.text
         remark = self.remark_input.text.strip()
-        amount = float(amount_text)
+        amount = amount_text  # 按输入的十进制文本换算成分，不经过浮点数
+
+        def on_save_error(error):
+            # 后台写盘失败：记录仓库已回滚，提示用户重新保存
+            self.result_label.text = "保存失败！记录未写入，请重试"
+            self.result_label.color = ERROR_COLOR
 
-        if save_record(category, remark, amount):
+        # 保存后立即显示成功（乐观更新），写盘在后台线程完成
+        if save_record(category, remark, amount, on_error=on_save_error):
             self.remark_input.text = ""
             self.amount_input.text = ""
             self.time_label.text = datetime.now().strftime("%Y-%m-%d %H:%M")
-            self.current_records = load_records()
-            self.parent_app.refresh_all_pages()  # 通知其他页面更新数据
-            self.result_label.text = f"保存成功！累计支出：{calculate_total(self.current_records)} 元"
+            # 其他页面由记录仓库的变化通知标记为待刷新，这里不再重绘
+            # 不限时间的累计支出（由汇总表直接给出，不遍历记录）
+            self.result_label.text = f"保存成功！累计支出：{format_money(calculate_total_by_time(None, ''))} 元"
             self.result_label.color = SUCCESS_COLOR
         else:
             self.result_label.text = "保存失败！请检查输入"
@@ -763,21 +3145,12 @@ class InputPage(BoxLayout):
                 self.result_label.color = ERROR_COLOR
                 return
 
-        # 修改这里的筛选逻辑以支持按月统计
-        if filter_type == "按月统计":
-            # 特殊处理：筛选指定月份的所有记录
-            filtered_records = [r for r in self.current_records if r["month"] == filter_value]
-        else:
-            filtered_records = filter_records_by_time(self.current_records, filter_type, filter_value)
-
-        total = calculate_total(filtered_records)
-
-        self.parent_app.refresh_all_pages()
-
+        # 按月统计同样由 filter_records_by_time 按月份筛选
+        total = calculate_total_by_time(None, filter_type, filter_value)
 
         # 根据筛选类型显示不同的结果文本
         display_text = self.get_filter_display_text(filter_type, filter_value)
-        self.result_label.text = f"{display_text}支出：{total} 元"
+        self.result_label.text = f"{display_text}支出：{format_money(total)} 元"
         self.result_label.color = ERROR_COLOR
 
     def on_filter_type_change(self, spinner, text):
@@ -857,6 +3230,145 @@ class InputPage(BoxLayout):
         self.stats_bg.size = instance.size
 
 
+def format_record_text(record: Dict) -> str:
+    """记录列表中一行的显示文本"""
+    # 移除颜色标签，使用黑色文字
+    return (
+        f"{record['time']} | "
+        f"分类：{record['category']} | "
+        f"备注：{record['remark'] or '无'} | "
+        f"[b]金额：{format_money(record['cents'])} 元[/b]"
+    )
+
+
+# 记录列表的一行：由 RecycleView 按可见区域创建并在滚动时复用
+class RecordRow(RecycleDataViewBehavior, BoxLayout):
+    record = ObjectProperty(None, allownone=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(orientation='horizontal', **kwargs)
+        self.padding = 10
+        self.list_view = None
+
+        # 记录信息部分 - 限制宽度，防止挤压编辑/删除按钮
+        record_info = BoxLayout(orientation='vertical',
+                                size_hint_x=0.7,  # 减小宽度比例，为编辑/删除按钮预留空间
+                                size_hint_y=None,
+                                height=70)
+
+        self.record_label = Label(
+            font_size=SMALL_CONTENT_FONT_SIZE,
+            color=TEXT_COLOR,
+            markup=True,
+            halign='left',
+            valign='middle',
+            font_name=DEFAULT_FONT
+        )
+        # 绑定宽度更新，确保文本能够正确换行（每个复用的行只绑定一次）
+        self.record_label.bind(width=lambda instance, width: setattr(instance, 'text_size', (width, None)))
+        record_info.add_widget(self.record_label)
+        self.add_widget(record_info)
+
+        # 编辑按钮和删除按钮 - 设置固定宽度，避免被挤压
+        self.edit_btn = StyledButton(
+            text="编辑",
+            font_size=BUTTON_FONT_SIZE - 8,
+            background_color=PRIMARY_COLOR,
+            size_hint_x=None,
+            width=80,
+            height=70,
+            font_name=DEFAULT_FONT
+        )
+        self.edit_btn.bind(on_press=self.on_edit_press)
+
+        self.delete_btn = StyledButton(
+            text="删除",
+            font_size=BUTTON_FONT_SIZE - 8,
+            background_color=ERROR_COLOR,
+            size_hint_x=None,  # 设置为None，使用固定宽度
+            width=80,  # 设置固定宽度
+            height=70,
+            font_name=DEFAULT_FONT
+        )
+        self.delete_btn.bind(on_press=self.on_delete_press)
+
+    def refresh_view_attrs(self, rv, index, data):
+        """RecycleView 把这一行绑定到新的数据项时调用"""
+        self.list_view = rv
+        # 只有提供回调的列表才显示编辑/删除按钮（按钮没有变化时不重新添加）
+        buttons = [button for button, callback in ((self.edit_btn, "edit_callback"),
+                                                   (self.delete_btn, "delete_callback"))
+                   if getattr(rv, callback, None) is not None]
+        shown = self.children[-2::-1]  # 记录信息右边的按钮（从左到右）
+        if shown != buttons:
+            for button in shown:
+                self.remove_widget(button)
+            for button in buttons:
+                self.add_widget(button)
+        return super().refresh_view_attrs(rv, index, data)
+
+    def on_record(self, instance, record):
+        # 只为屏幕上可见的行格式化文本
+        self.record_label.text = format_record_text(record) if record else ""
+
+    def on_edit_press(self, instance):
+        if self.record is not None and self.list_view is not None:
+            self.list_view.edit_callback(self.record)
+
+    def on_delete_press(self, instance):
+        # 按记录的 id（而不是渲染时的列表位置）删除
+        if self.record is not None and self.list_view is not None:
+            self.list_view.delete_callback(self.record)
+
+
+def create_record_list_view(delete_callback=None, edit_callback=None):
+    """创建虚拟化的记录列表（只实例化可见区域的行）"""
+    # 只有按需创建的搜索/记录页用到，不在启动时导入
+    from kivy.uix.recycleview import RecycleView
+    from kivy.uix.recycleboxlayout import RecycleBoxLayout
+
+    list_view = RecycleView(size_hint_y=1)
+    list_view.delete_callback = delete_callback
+    list_view.edit_callback = edit_callback
+    layout = RecycleBoxLayout(
+        orientation='vertical',
+        default_size=(None, 100),
+        default_size_hint=(1, None),
+        size_hint_y=None,
+        spacing=5
+    )
+    layout.bind(minimum_height=layout.setter('height'))
+    list_view.add_widget(layout)
+    # viewclass 会转交给布局管理器，必须在添加布局之后设置
+    list_view.viewclass = RecordRow
+    return list_view
+
+
+# 搜索结果每次从游标中取出的条数，以及触发加载下一批的滚动位置（0 为底部）
+SEARCH_PAGE_SIZE = 30
+SEARCH_LOAD_MORE_THRESHOLD = 0.1
+
+
+class ResultCursor:
+    """结果游标：按从新到旧的顺序分批取出记录，不一次性生成全部列表项"""
+
+    def __init__(self, records: List[Dict]):
+        self._records = records
+        self._pos = len(records)
+
+    @property
+    def exhausted(self) -> bool:
+        return self._pos <= 0
+
+    def fetch(self, count: int) -> List[Dict]:
+        """取出接下来（更早的）最多 count 条记录"""
+        start = max(self._pos - count, 0)
+        batch = self._records[start:self._pos]
+        batch.reverse()
+        self._pos = start
+        return batch
+
+
 # 第二页：搜索页面
 class SearchPage(BoxLayout):
     def __init__(self, parent_app, **kwargs):
@@ -891,15 +3403,22 @@ class SearchPage(BoxLayout):
 
         self.add_widget(self.search_result_label)
 
-        # 搜索结果记录展示区域
-        self.search_record_scroll = ScrollView(size_hint_y=0.5)
-        self.search_record_layout = GridLayout(cols=1, spacing=5, size_hint_y=None)
-        self.search_record_layout.bind(minimum_height=self.search_record_layout.setter('height'))
-        self.search_record_scroll.add_widget(self.search_record_layout)
-        self.add_widget(self.search_record_scroll)
-
-        # 初始化加载记录
-        self.current_records = load_records()
+        # 搜索结果记录展示区域（虚拟化列表，结果按批从游标中取出）
+        self.search_record_container = BoxLayout(orientation="vertical", size_hint_y=0.5)
+        self.search_record_view = create_record_list_view()
+        self.search_record_view.bind(scroll_y=self.on_search_scroll)
+        self.search_cursor = None
+        self.current_keyword = ""  # 最近一次搜索的关键词，数据变化后按它重新搜索
+        self.search_empty_label = Label(
+            text="暂无匹配记录",
+            font_size=SMALL_CONTENT_FONT_SIZE,
+            color=ERROR_COLOR,
+            size_hint_x=0.8,
+            size_hint_y=0.1,
+            font_name=DEFAULT_FONT
+        )
+        self.search_empty_label.bind(height=update_all_font_size)
+        self.add_widget(self.search_record_container)
 
     def create_search_section(self):
         search_layout = GridLayout(cols=3, spacing=10, size_hint_y=0.15, padding=10)
@@ -940,65 +3459,49 @@ class SearchPage(BoxLayout):
             self.search_result_label.color = ERROR_COLOR
             return
 
-        matched_records = search_records(self.current_records, keyword)
+        self.current_keyword = keyword
+        self.show_search_results(keyword)
+
+    def show_search_results(self, keyword: str):
+        """搜索并展示结果和总额"""
+        matched_records = search_records(None, keyword)
+        # 条数和总额直接从匹配结果计算，与列表渲染无关
         total = calculate_total(matched_records)
 
         self.refresh_search_records(matched_records)
-        self.search_result_label.text = f"搜索「{keyword}」总支出：{total} 元"
+        self.search_result_label.text = f"搜索「{keyword}」共 {len(matched_records)} 条，总支出：{format_money(total)} 元"
         self.search_result_label.color = TEXT_COLOR
 
     def refresh_search_records(self, records: List[Dict]):
-        """刷新搜索记录展示区域"""
-        self.search_record_layout.clear_widgets()
+        """刷新搜索记录展示区域（只取出第一屏的结果，其余滚动到底部时再取）"""
+        self.search_record_container.clear_widgets()
+        self.search_cursor = ResultCursor(records)
 
         if not records:
-            empty_label = Label(
-                text="暂无匹配记录",
-                font_size=SMALL_CONTENT_FONT_SIZE,
-                color=ERROR_COLOR,
-                size_hint_x=0.8,
-                size_hint_y=0.1,
-                font_name=DEFAULT_FONT
-            )
-            empty_label.bind(height=update_all_font_size)
-            self.search_record_layout.add_widget(empty_label)
+            self.search_record_view.data = []
+            self.search_record_container.add_widget(self.search_empty_label)
             return
 
-        for i, record in enumerate(reversed(records)):
-            # 创建包含记录信息和（预留）删除按钮的BoxLayout
-            record_box = BoxLayout(orientation='horizontal', size_hint_y=None, height=100, padding=10)
-
-            # 记录信息部分 - 限制宽度，防止挤压其他元素
-            record_info = BoxLayout(orientation='vertical',
-                                    size_hint_x=0.7,  # 减小宽度比例，为其他元素预留空间
-                                    size_hint_y=None,
-                                    height=70)
-
-            # 移除颜色标签，使用黑色文字
-            record_text = (
-                f"{record['time']} | "
-                f"分类：{record['category']} | "
-                f"备注：{record['remark'] or '无'} | "
-                f"[b]金额：{record['amount']} 元[/b]"
-            )
+        self.search_record_view.data = [{"record": record} for record in self.search_cursor.fetch(SEARCH_PAGE_SIZE)]
+        self.search_record_view.scroll_y = 1
+        self.search_record_container.add_widget(self.search_record_view)
 
-            record_label = Label(
-                text=record_text,
-                font_size=SMALL_CONTENT_FONT_SIZE,
-                color=TEXT_COLOR,
-                markup=True,
-                halign='left',
-                valign='middle',
-                text_size=(record_info.width, None),  # 设置text_size以适应容器宽度
-                font_name=DEFAULT_FONT
-            )
-            # 绑定宽度更新，确保文本能够正确换行
-            record_label.bind(width=lambda instance, width: setattr(instance, 'text_size', (width, None)))
+    def refresh_page(self):
+        """整页刷新：有搜索关键词时重新搜索，否则展示全部记录"""
+        if self.current_keyword:
+            self.show_search_results(self.current_keyword)
+        else:
+            self.refresh_search_records(record_repository.recent_records())
 
-            record_info.add_widget(record_label)
-            record_box.add_widget(record_info)
+    def apply_records_change(self, op: str, record: Dict):
+        self.refresh_page()
 
-            self.search_record_layout.add_widget(record_box)
+    def on_search_scroll(self, instance, scroll_y):
+        """滚动接近底部时从游标中再取一批结果"""
+        if scroll_y <= SEARCH_LOAD_MORE_THRESHOLD and self.search_cursor and not self.search_cursor.exhausted:
+            self.search_record_view.data.extend(
+                {"record": record} for record in self.search_cursor.fetch(SEARCH_PAGE_SIZE)
+            )
 
     def _update_rect(self, instance, value):
         self.rect.pos = instance.pos
@@ -1049,90 +3552,80 @@ class RecordsPage(BoxLayout):
         )
         self.add_widget(self.total_label)
 
-        # 记录展示区域
-        self.record_scroll = ScrollView(size_hint_y=1)
-        self.record_layout = GridLayout(cols=1, spacing=5, size_hint_y=None)
-        self.record_layout.bind(minimum_height=self.record_layout.setter('height'))
-        self.record_scroll.add_widget(self.record_layout)
-        self.add_widget(self.record_scroll)
+        # 记录展示区域（虚拟化列表，只创建可见的行）
+        self.record_container = BoxLayout(orientation="vertical", size_hint_y=1)
+        self.record_view = create_record_list_view(delete_callback=self.confirm_delete,
+                                                   edit_callback=self.show_edit_popup)
+        self.empty_label = Label(
+            text="暂无记录",
+            font_size=SMALL_CONTENT_FONT_SIZE,
+            color=(0.6, 0.6, 0.6, 1),
+            size_hint_y=None,
+            height=40,
+            font_name=DEFAULT_FONT
+        )
+        self.add_widget(self.record_container)
 
-        # 初始化加载记录
-        self.current_records = load_records()
-        self.refresh_records(self.current_records)
+        # 初始化加载记录（启动时的加载还没完成时先显示已解析出的最新记录）
+        self.refresh_records(record_repository.recent_records())
 
-    # 在 RecordsPage 类的 refresh_records 方法中，修改记录项的创建部分
+    @profiled()
     def refresh_records(self, records: List[Dict]):
-        """刷新记录展示区域"""
-        self.record_layout.clear_widgets()
+        """刷新记录展示区域（只更新数据，行控件由 RecycleView 复用）"""
+        self.record_container.clear_widgets()
 
         if not records:
-            empty_label = Label(
-                text="暂无记录",
-                font_size=SMALL_CONTENT_FONT_SIZE,
-                color=(0.6, 0.6, 0.6, 1),
-                size_hint_y=None,
-                height=40,
-                font_name=DEFAULT_FONT
-            )
-            self.record_layout.add_widget(empty_label)
-            return
-
-        for i, record in enumerate(reversed(records)):
-            # 创建包含记录信息和删除按钮的BoxLayout
-            record_box = BoxLayout(orientation='horizontal', size_hint_y=None, height=100, padding=10)
-
-            # 记录信息部分 - 限制宽度，防止挤压删除按钮
-            record_info = BoxLayout(orientation='vertical',
-                                    size_hint_x=0.7,  # 减小宽度比例，为删除按钮预留空间
-                                    size_hint_y=None,
-                                    height=70)
-
-            # 移除颜色标签，使用黑色文字
-            record_text = (
-                f"{record['time']} | "
-                f"分类：{record['category']} | "
-                f"备注：{record['remark'] or '无'} | "
-                f"[b]金额：{record['amount']} 元[/b]"
-            )
-
-            record_label = Label(
-                text=record_text,
-                font_size=SMALL_CONTENT_FONT_SIZE,
-                color=TEXT_COLOR,
-                markup=True,
-                halign='left',
-                valign='middle',
-                text_size=(record_info.width, None),  # 设置text_size以适应容器宽度
-                font_name=DEFAULT_FONT
-            )
-            # 绑定宽度更新，确保文本能够正确换行
-            record_label.bind(width=lambda instance, width: setattr(instance, 'text_size', (width, None)))
-
-            record_info.add_widget(record_label)
-            record_box.add_widget(record_info)
-
-            # 删除按钮部分 - 设置固定宽度，避免被挤压
-            delete_btn = StyledButton(
-                text="删除",
-                font_size=BUTTON_FONT_SIZE - 8,
-                background_color=ERROR_COLOR,
-                size_hint_x=None,  # 设置为None，使用固定宽度
-                width=80,  # 设置固定宽度
-                height=70,
-                font_name=DEFAULT_FONT
-            )
-            # 将记录索引绑定到按钮
-            delete_btn.bind(on_press=lambda x, idx=len(records) - 1 - i: self.confirm_delete(idx))
-            record_box.add_widget(delete_btn)
-
-            self.record_layout.add_widget(record_box)
+            self.record_view.data = []
+            self.record_container.add_widget(self.empty_label)
+        else:
+            # 最新的记录在最上面
+            self.record_view.data = [{"record": record} for record in reversed(records)]
+            self.record_container.add_widget(self.record_view)
 
-        # 更新总金额
-        total = calculate_total(records)
-        self.total_label.text = f"总支出：{total} 元"
+        # 更新总金额（加载完成后页面会收到 "reload" 通知再次刷新）
+        if record_repository.loading:
+            self.total_label.text = f"正在加载记录…（已显示最近 {len(records)} 条）"
+        else:
+            total = calculate_total(records)
+            self.total_label.text = f"总支出：{format_money(total)} 元"
+
+    def refresh_page(self):
+        """整页刷新（切换到该页且数据有变化时调用）"""
+        self.refresh_records(record_repository.recent_records())
+
+    def _row_position(self, record_id: int):
+        """记录在列表数据中的位置（最新的在最上面，即按 id 递减排列，二分查找），找不到返回 None"""
+        data = self.record_view.data
+        pos = bisect_left(data, -record_id, key=lambda item: -item["record"]["id"])
+        if pos < len(data) and data[pos]["record"]["id"] == record_id:
+            return pos
+        return next((i for i, item in enumerate(data) if item["record"]["id"] == record_id), None)
+
+    @profiled()
+    def apply_records_change(self, op: str, record: Dict):
+        """页面可见时的增量更新：保存只插入一行，修改只替换一行，删除只移除一行"""
+        data = self.record_view.data
+        if op == "add" and data:
+            # 最新的记录在最上面
+            data.insert(0, {"record": record})
+        elif op == "update" and data:
+            pos = self._row_position(record["id"])
+            if pos is not None:
+                data[pos] = {"record": record}
+        elif op == "delete" and len(data) > 1:
+            pos = self._row_position(record["id"])
+            if pos is not None:
+                del data[pos]
+        else:
+            # 空列表和最后一条被删除时需要切换“暂无记录”提示
+            self.refresh_page()
+            return
+        # 总金额由汇总表直接给出，不遍历记录
+        self.total_label.text = f"总支出：{format_money(calculate_total_by_time(None, ''))} 元"
 
-    def confirm_delete(self, index):
+    def confirm_delete(self, record):
         """确认删除记录"""
+        from kivy.uix.popup import Popup  # 弹窗模块只在第一次删除时导入
         # 创建确认弹窗
         content = BoxLayout(orientation='vertical', padding=10, spacing=10)
 
@@ -1172,7 +3665,7 @@ class RecordsPage(BoxLayout):
         )
 
         def do_delete(instance):
-            self.delete_record(index)
+            self.delete_record(record)
             popup.dismiss()
 
         def dismiss_popup(instance):
@@ -1183,25 +3676,111 @@ class RecordsPage(BoxLayout):
 
         popup.open()
 
-    def delete_record(self, index):
-        """删除指定索引的记录"""
-        try:
-            records = load_records()
-            if 0 <= index < len(records):
-                deleted_record = records.pop(index)
+    def delete_record(self, record):
+        """删除指定的记录（按记录 id 定位，列表在此期间变化也不会删错）"""
+        def on_delete_error(error):
+            # 后台写盘失败：记录仓库已按磁盘内容回滚，列表会随之恢复
+            print(f"删除记录失败，已恢复: {error}")
+
+        if delete_record(record["id"], on_error=on_delete_error):
+            # 列表由记录仓库的变化通知增量更新
+            print(f"已删除记录: {record}")
+
+    def show_edit_popup(self, record):
+        """编辑记录的分类、备注和金额（时间不变）"""
+        from kivy.uix.popup import Popup  # 弹窗模块只在第一次编辑时导入
+        content = BoxLayout(orientation='vertical', padding=10, spacing=10)
+
+        time_label = Label(
+            text=f"时间：{record['time']}",
+            font_size=CONTENT_FONT_SIZE,
+            font_name=DEFAULT_FONT
+        )
+        # 不在预设分类中的旧分类也保留为可选项
+        categories = EXPENSE_CATEGORIES if record["category"] in EXPENSE_CATEGORIES \
+            else EXPENSE_CATEGORIES + [record["category"]]
+        category_spinner = Spinner(
+            text=record["category"],
+            values=categories,
+            size_hint_y=None,
+            height=50,
+            font_name=DEFAULT_FONT
+        )
+        remark_input = TextInput(
+            text=record["remark"],
+            hint_text="备注（可空）",
+            multiline=False,
+            size_hint_y=None,
+            height=50,
+            font_name=DEFAULT_FONT
+        )
+        amount_input = TextInput(
+            text=format_money(record["cents"]),
+            hint_text="金额（元）",
+            input_filter="float",
+            multiline=False,
+            size_hint_y=None,
+            height=50,
+            font_name=DEFAULT_FONT
+        )
+        message = Label(
+            text="",
+            font_size=SMALL_CONTENT_FONT_SIZE,
+            color=ERROR_COLOR,
+            size_hint_y=None,
+            height=30,
+            font_name=DEFAULT_FONT
+        )
+
+        buttons = BoxLayout(size_hint_y=None, height=50, spacing=10)
+        cancel_btn = StyledButton(
+            text="取消",
+            font_size=BUTTON_FONT_SIZE,
+            background_color=WARNING_COLOR,
+            font_name=DEFAULT_FONT
+        )
+        save_btn = StyledButton(
+            text="保存修改",
+            font_size=BUTTON_FONT_SIZE,
+            background_color=SUCCESS_COLOR,
+            font_name=DEFAULT_FONT
+        )
+        buttons.add_widget(cancel_btn)
+        buttons.add_widget(save_btn)
 
-                # 保存更新后的记录
-                with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(records, f, ensure_ascii=False, indent=2)
+        for widget in (time_label, category_spinner, remark_input, amount_input, message, buttons):
+            content.add_widget(widget)
+
+        popup = Popup(
+            title="编辑记录",
+            content=content,
+            size_hint=(0.85, 0.6),
+            auto_dismiss=False
+        )
 
-                # 刷新所有页面
-                self.parent_app.refresh_all_pages()
+        def on_edit_error(error):
+            # 后台写盘失败：记录仓库已按磁盘内容回滚，列表会随之恢复
+            print(f"修改记录失败，已恢复: {error}")
 
-                print(f"已删除记录: {deleted_record}")
+        def do_save(instance):
+            amount_text = amount_input.text.strip()
+            if parse_amount(amount_text) is None:
+                message.text = "错误：金额必须是大于0的数字！"
+                return
+            # 按 id 修改，列表在弹窗打开期间变化也不会改错记录
+            if update_record(record["id"], category_spinner.text, remark_input.text.strip(),
+                             amount_text, on_error=on_edit_error):
+                popup.dismiss()
             else:
-                print("删除失败：索引超出范围")
-        except Exception as e:
-            print(f"删除记录失败: {e}")
+                message.text = "修改失败：记录已不存在"
+
+        def dismiss_popup(instance):
+            popup.dismiss()
+
+        save_btn.bind(on_press=do_save)
+        cancel_btn.bind(on_press=dismiss_popup)
+
+        popup.open()
 
     def _update_rect(self, instance, value):
         self.rect.pos = instance.pos
@@ -1242,12 +3821,12 @@ class StatisticsPage(BoxLayout):
         control_layout.size_hint_y = 0.15
         self.add_widget(control_layout)
 
-        # 图表区域
+        # 图表区域（显示缓存的图表纹理）
         self.chart_container = BoxLayout(size_hint_y=1)
+        self.chart_view = CachedChartView()
+        self.chart_container.add_widget(self.chart_view)
         self.add_widget(self.chart_container)
 
-        # 初始化加载记录
-        self.current_records = load_records()
         self.show_statistics()
 
     def create_control_section(self):
@@ -1304,38 +3883,31 @@ class StatisticsPage(BoxLayout):
         return control_layout
 
     def show_statistics(self, instance=None):
-        """显示统计数据"""
+        """显示统计数据（在后台线程中计算；相同的筛选条件、数据版本和尺寸直接使用缓存的图表纹理）"""
         time_filter = self.time_filter_spinner.text
         category_filter = self.category_filter_spinner.text
 
-        # 根据时间筛选类型获取统计数据
-        if time_filter == "按月统计":
-            monthly_data = get_monthly_statistics(self.current_records, category_filter)
-        elif time_filter == "按日统计":
-            monthly_data = get_daily_statistics(self.current_records, category_filter)
-        elif time_filter == "按年统计":
-            monthly_data = get_yearly_statistics(self.current_records, category_filter)
-        else:
-            monthly_data = []
-
-        # 清除旧的图表
-        self.chart_container.clear_widgets()
+        def compute(rollups):
+            # 根据时间筛选类型获取统计数据
+            records = None
+            if time_filter == "按月统计":
+                return get_monthly_statistics(records, category_filter, rollups)
+            elif time_filter == "按日统计":
+                return get_daily_statistics(records, category_filter, rollups)
+            elif time_filter == "按年统计":
+                return get_yearly_statistics(records, category_filter, rollups)
+            return []
+
+        # 统计范围随日期变化（最近20天、当前年份），日期也作为缓存键的一部分
+        chart_key = ("bar", time_filter, category_filter, datetime.now().strftime("%Y-%m-%d"),
+                     record_repository.version)
+        self.chart_view.set_chart(chart_key, compute, lambda data: BarChartWidget(data=data))
+
+    def refresh_page(self):
+        self.show_statistics()
 
-        # 创建新的图表
-        if monthly_data:
-            chart_widget = BarChartWidget(data=monthly_data)
-            self.chart_container.add_widget(chart_widget)
-        else:
-            # 显示无数据提示
-            no_data_label = Label(
-                text="暂无统计数据",
-                font_size=TITLE_FONT_SIZE,
-                color=TEXT_COLOR,
-                halign="center",
-                valign="middle",
-                font_name=DEFAULT_FONT
-            )
-            self.chart_container.add_widget(no_data_label)
+    def apply_records_change(self, op: str, record: Dict):
+        self.show_statistics()
 
     def _update_rect(self, instance, value):
         self.rect.pos = instance.pos
@@ -1381,12 +3953,12 @@ class AnalysisPage(BoxLayout):
         control_layout.size_hint_y = 0.15
         self.add_widget(control_layout)
 
-        # 图表区域
+        # 图表区域（显示缓存的图表纹理）
         self.chart_container = BoxLayout(size_hint_y=1)
+        self.chart_view = CachedChartView()
+        self.chart_container.add_widget(self.chart_view)
         self.add_widget(self.chart_container)
 
-        # 初始化加载记录
-        self.current_records = load_records()
         self.show_analysis()
 
     def create_control_section(self):
@@ -1501,115 +4073,145 @@ class AnalysisPage(BoxLayout):
 
             self.date_input_container.add_widget(placeholder_label)
 
-    def get_filtered_records(self):
-        """根据筛选条件获取记录"""
+    def get_filter_value(self):
+        """根据筛选条件返回 (筛选类型, 筛选值)，输入无效时返回 None"""
         filter_type = self.time_filter_spinner.text
-        records = self.current_records
 
-        if filter_type == "本月":
-            current_month = datetime.now().strftime("%Y-%m")
-            return [r for r in records if r["month"] == current_month]
-        elif filter_type == "本年":
-            current_year = datetime.now().strftime("%Y")
-            return [r for r in records if r["year"] == current_year]
-        elif filter_type == "自定义月份":
+        if filter_type == "自定义月份":
             year = self.year_input.text.strip()
             month = self.month_input.text.strip()
 
             if not year or not month:
-                return []
+                return None
 
             try:
                 year_int = int(year)
                 month_int = int(month)
                 if month_int < 1 or month_int > 12:
-                    return []
+                    return None
 
-                target_month = f"{year_int}-{month_int:02d}"
-                return [r for r in records if r["month"] == target_month]
+                return filter_type, f"{year_int}-{month_int:02d}"
             except ValueError:
-                return []
+                return None
         elif filter_type == "自定义年份":
             year = self.year_input.text.strip()
             if not year:
-                return []
+                return None
 
-            return [r for r in records if r["year"] == year]
+            return filter_type, year
 
-        return records
+        return filter_type, ""
 
-    def calculate_category_distribution(self, records):
-        """计算各分类的分布情况"""
-        # 初始化所有分类的金额为0
-        category_totals = {category: 0.0 for category in EXPENSE_CATEGORIES}
+    def show_analysis(self, instance=None):
+        """显示分析图表（在后台线程中计算；相同的筛选条件、数据版本和尺寸直接使用缓存的图表纹理）"""
+        filter_value = self.get_filter_value()
+        filter_type = self.time_filter_spinner.text
 
-        # 计算每个分类的总金额
-        for record in records:
-            category = record["category"]
-            if category in category_totals:
-                category_totals[category] += record["amount"]
-
-        # 计算总金额
-        total_amount = sum(category_totals.values())
-
-        # 只返回有金额的分类，过滤掉金额为0的分类
-        distribution = []
-        for category in EXPENSE_CATEGORIES:
-            amount = category_totals[category]
-            if amount > 0:  # 只添加有金额的分类
-                percentage = (amount / total_amount * 100) if total_amount > 0 else 0
-                angle = (amount / total_amount * 360) if total_amount > 0 else 0
-                distribution.append({
-                    "category": category,
-                    "amount": amount,
-                    "percentage": percentage,
-                    "angle": angle
-                })
-
-        return distribution, total_amount
+        def compute(rollups):
+            # 按筛选条件汇总各分类金额（sqlite引擎下在数据库内求和）
+            if filter_value is None:
+                category_totals = {}
+            else:
+                category_totals = get_category_totals(None, *filter_value, rollups=rollups)
 
-    def show_analysis(self, instance=None):
-        """显示分析图表"""
-        # 获取筛选后的记录
-        filtered_records = self.get_filtered_records()
+            # 计算分类分布
+            return build_category_distribution(category_totals)
+
+        def build_chart(data):
+            distribution, total_amount = data
+            return PieChartWidget(
+                data=distribution,
+                total_amount=total_amount,
+                filter_type=filter_type
+            )
 
-        # 计算分类分布
-        distribution, total_amount = self.calculate_category_distribution(filtered_records)
+        # “本月”“本年”随日期变化，日期也作为缓存键的一部分
+        chart_key = ("pie", filter_value, datetime.now().strftime("%Y-%m-%d"), record_repository.version)
+        self.chart_view.set_chart(chart_key, compute, build_chart)
 
-        # 清除旧的图表
-        self.chart_container.clear_widgets()
+    def refresh_page(self):
+        self.show_analysis()
 
-        # 创建新的扇形图
-        pie_chart = PieChartWidget(
-            data=distribution,
-            total_amount=total_amount,
-            filter_type=self.time_filter_spinner.text
-        )
-        self.chart_container.add_widget(pie_chart)
+    def apply_records_change(self, op: str, record: Dict):
+        self.show_analysis()
 
     def _update_rect(self, instance, value):
         self.rect.pos = instance.pos
         self.rect.size = instance.size
 
 
-# 自定义扇形图组件
+# 扇形图的细分级别：按半径选择能让弦误差小于半个像素的最小级别
+PIE_TESSELLATION_LEVELS = (32, 64, 128, 256)
+_unit_circle_cache = {}
+
+
+def pie_tessellation_level(radius: float) -> int:
+    """按半径选择整圆的分段数（半径越大分段越多）"""
+    if radius > 0.5:
+        needed = math.pi / math.acos(1 - 0.5 / radius)
+        for level in PIE_TESSELLATION_LEVELS:
+            if level >= needed:
+                return level
+        return PIE_TESSELLATION_LEVELS[-1]
+    return PIE_TESSELLATION_LEVELS[0]
+
+
+def unit_circle(level: int):
+    """单位圆上等分的 level + 1 个点 (cos, sin)，按级别缓存"""
+    points = _unit_circle_cache.get(level)
+    if points is None:
+        points = [(math.cos(2 * math.pi * k / level), math.sin(2 * math.pi * k / level))
+                  for k in range(level + 1)]
+        _unit_circle_cache[level] = points
+    return points
+
+
+def unit_sector(start_angle: float, end_angle: float, level: int):
+    """扇形在单位圆上的顶点（第一个为圆心），供 triangle_fan 模式的 Mesh 使用"""
+    table = unit_circle(level)
+    step = 360.0 / level
+    points = [(0.0, 0.0), (math.cos(math.radians(start_angle)), math.sin(math.radians(start_angle)))]
+    k = int(start_angle // step) + 1
+    while k < len(table) and k * step < end_angle:
+        points.append(table[k])
+        k += 1
+    points.append((math.cos(math.radians(end_angle)), math.sin(math.radians(end_angle))))
+    return points
+
+
+# 自定义扇形图组件：每个扇形一个 Mesh，尺寸/位置变化时只变换顶点，不重建绘制指令和标签
 class PieChartWidget(FloatLayout):
+    # 颜色列表（可保留，或替换为你想要的淡粉色/淡蓝色）
+    colors = [
+        (0.95, 0.75, 0.85, 1),  # 稍深的淡粉色（原0.98,0.85,0.9 → 降低红/绿/蓝，粉色更明显）
+        (0.6, 0.75, 0.88, 1),  # 稍深的淡蓝色（原0.7,0.85,0.95 → 降低蓝调，更温润）
+        (0.85, 0.85, 0.7, 1),  # 稍深的淡黄色（原0.9,0.9,0.8 → 降低黄调，偏奶油黄）
+        (0.75, 0.88, 0.75, 1),  # 稍深的淡绿色（原0.85,0.95,0.85 → 降低绿调，偏薄荷绿）
+        (0.9, 0.75, 0.75, 1)
+    ]
+
     def __init__(self, data=[], total_amount=0, filter_type="", **kwargs):
         super().__init__(**kwargs)
         self.data = data
         self.total_amount = total_amount
         self.filter_type = filter_type
-        self.bind(size=self.draw_chart, pos=self.draw_chart)
+        self.slices = []  # [(Mesh, 起始角度, 角度, 分类标签)]
+        self.legend_items = []  # [(颜色块 Rectangle, 图例标签)]
+        self.unit_sectors = []  # 每个扇形在单位圆上的顶点
+        self.tessellation_level = None  # 当前细分级别（整圆分段数）
+        self.bind(size=self.update_geometry, pos=self.update_geometry)
         self.draw_chart()
 
+    @profiled()
     def draw_chart(self, *args):
+        """创建绘制指令和标签（每份数据只执行一次）"""
         # 清除之前的绘制
         self.canvas.clear()
-
-        # 移除之前添加的所有标签
-        for child in list(self.children):
-            if isinstance(child, Label):
-                self.remove_widget(child)
+        self.clear_widgets()
+        self.slices = []
+        self.legend_items = []
+        self.unit_sectors = []
+        self.tessellation_level = None
 
         if not self.data or self.total_amount == 0:
             # 显示无数据提示（绑定字体自动缩放）
@@ -1624,130 +4226,297 @@ class PieChartWidget(FloatLayout):
             self.add_widget(no_data_label)
             return
 
-        # ========== 核心修改1：自动计算中心位置（比例缩放，替代固定+80） ==========
-        center_x = self.center_x
-        offset_ratio = 0.1  # 垂直偏移比例（容器高度的10%），可调整0.08~0.12
-        center_y = self.center_y + (self.height * offset_ratio)  # 替换固定+80
-
-        # ========== 核心修改2：自动计算半径（比例预留图例空间，替代固定-150） ==========
-        legend_space_ratio = 0.25  # 图例预留空间比例（容器高度的25%），可调整0.2~0.3
-        radius = min(
-            self.width * 0.4,  # 宽度的40%
-            (self.height - self.height * legend_space_ratio) * 0.4  # 高度扣除图例空间后取40%
-        )
-
-        # 颜色列表（可保留，或替换为你想要的淡粉色/淡蓝色）
-        colors = [
-            (0.95, 0.75, 0.85, 1),  # 稍深的淡粉色（原0.98,0.85,0.9 → 降低红/绿/蓝，粉色更明显）
-            (0.6, 0.75, 0.88, 1),  # 稍深的淡蓝色（原0.7,0.85,0.95 → 降低蓝调，更温润）
-            (0.85, 0.85, 0.7, 1),  # 稍深的淡黄色（原0.9,0.9,0.8 → 降低黄调，偏奶油黄）
-            (0.75, 0.88, 0.75, 1),  # 稍深的淡绿色（原0.85,0.95,0.85 → 降低绿调，偏薄荷绿）
-            (0.9, 0.75, 0.75, 1)
-        ]
-
-        # 绘制扇形和标签
+        # 扇形：每个分类一个 Mesh，顶点在 update_geometry 中按尺寸计算
         start_angle = 0  # 从0度开始
         for i, item in enumerate(self.data):
             if item["angle"] <= 0:
                 continue
 
-            # 计算颜色
-            color_idx = i % len(colors)
             with self.canvas:
-                Color(*colors[color_idx])
-
-                # 创建三角形扇形（使用多个小三角形近似圆形扇形）
-                segments = max(int(item["angle"] * 5), 5)  # 根据角度决定分割数量
-                angle_step = item["angle"] / segments
-
-                for j in range(segments):
-                    current_angle = start_angle + j * angle_step
-                    next_angle = start_angle + (j + 1) * angle_step
-
-                    # 计算扇形的三个点：中心点、起始点、结束点
-                    start_x = center_x + radius * math.cos(math.radians(current_angle))
-                    start_y = center_y + radius * math.sin(math.radians(current_angle))
-                    end_x = center_x + radius * math.cos(math.radians(next_angle))
-                    end_y = center_y + radius * math.sin(math.radians(next_angle))
-
-                    # 绘制三角形
-                    Triangle(
-                        points=[center_x, center_y, start_x, start_y, end_x, end_y]
-                    )
-
-            # ========== 核心修改3：扇形内部标签（移除固定字体，绑定自动缩放） ==========
-            # 计算标签位置 - 在扇形中心位置显示类别名称
-            mid_angle = start_angle + item["angle"] / 2  # 扇形的中间角度
-            # 将标签稍微往扇形外侧放置，以便更清晰可见
-            label_distance = radius * 0.6  # 调整标签距离中心的距离
-            label_x = center_x + label_distance * math.cos(math.radians(mid_angle))
-            label_y = center_y + label_distance * math.sin(math.radians(mid_angle))
-
-            # 创建标签显示分类名称（移除固定字体大小）
+                Color(*self.colors[i % len(self.colors)])
+                mesh = Mesh(mode="triangle_fan")
+
+            # 扇形内部标签：显示分类名称（绑定字体自动缩放）
             label = Label(
                 text=item['category'],
-                color=TEXT_COLOR,  # 白色文字（与扇形色对比）
+                color=TEXT_COLOR,
                 halign="center",
                 valign="middle",
                 font_name=DEFAULT_FONT,
-                size_hint=(None, None),
-                width=radius * 0.4,  # 按半径比例设宽度
-                height=radius * 0.2  # 按半径比例设高度
+                size_hint=(None, None)
             )
-            # 绑定字体自动缩放
             label.bind(height=update_all_font_size)
-            # 设置标签位置
-            label.center_x = label_x
-            label.center_y = label_y
             self.add_widget(label)
 
+            self.slices.append((mesh, start_angle, item["angle"], label))
             start_angle += item["angle"]
 
-        # ========== 核心修改4：图例位置（比例计算，替代固定像素） ==========
-        # 绘制图例 - 放在扇形图下方（比例计算位置）
-        legend_offset_ratio = 0.1  # 图例与扇形的间距比例（容器高度的10%）
-        legend_start_y = center_y - radius - (self.height * legend_offset_ratio)
-        legend_height_ratio = 0.03  # 每行图例高度比例（容器高度的5%）
-        legend_padding_ratio = 0.02  # 图例间距比例（容器高度的2%）
-        color_block_size = min(radius * 0.1, 20)  # 颜色块大小（按半径比例）
-
-        # 为每个图例项创建单独的一行
+        # 图例：颜色块 + 说明文字，每个分类一行
         for i, item in enumerate(self.data):
-            color_idx = i % len(colors)
-
-            # 计算图例项的位置（比例缩放）
-            legend_y = legend_start_y - i * (self.height * legend_height_ratio) - i * (self.height * legend_padding_ratio)
-            # 图例项居中显示
-            item_width_ratio = 0.6  # 图例项宽度比例（容器宽度的60%）
-            item_width = self.width * item_width_ratio
-            legend_x = self.center_x - item_width / 2  # 居中对齐
-
-            # 绘制颜色块（比例大小）
-            color_block_y = legend_y + (self.height * legend_height_ratio - color_block_size) // 2
             with self.canvas:
-                Color(*colors[color_idx])
-                Rectangle(pos=(legend_x, color_block_y), size=(color_block_size, color_block_size))
+                Color(*self.colors[i % len(self.colors)])
+                color_block = Rectangle()
 
-            # ========== 核心修改5：图例文字（移除固定字体，绑定自动缩放） ==========
-            # 绘制说明文字（移除固定字体大小）
-            legend_text = f"{item['category']}: {item['amount']:.2f}元({item['percentage']:.1f}%)"
+            legend_text = f"{item['category']}: {format_money(item['cents'])}元({item['percentage']:.1f}%)"
             legend_label = Label(
                 text=legend_text,
                 color=TEXT_COLOR,
                 halign="left",  # 设置为左对齐
                 valign="middle",  # 垂直居中
                 font_name=DEFAULT_FONT,
-                size_hint=(None, None),
-                width=item_width - color_block_size - 20,  # 按比例宽度
-                height=self.height * legend_height_ratio,  # 按比例高度
-                text_size=(item_width - color_block_size - 20, None)
+                size_hint=(None, None)
             )
-            # 绑定字体自动缩放
             legend_label.bind(height=update_all_font_size)
+            self.add_widget(legend_label)
+
+            self.legend_items.append((color_block, legend_label))
+
+        self.update_geometry()
+
+    def update_geometry(self, *args):
+        """按当前尺寸变换顶点并移动标签（不创建新的绘制指令）"""
+        if not self.slices and not self.legend_items:
+            return
+
+        # 中心位置：垂直方向上移容器高度的10%，为下方图例留出空间
+        center_x = self.center_x
+        offset_ratio = 0.1  # 垂直偏移比例（容器高度的10%），可调整0.08~0.12
+        center_y = self.center_y + (self.height * offset_ratio)
+
+        # 半径：高度扣除图例预留空间后取40%
+        legend_space_ratio = 0.25  # 图例预留空间比例（容器高度的25%），可调整0.2~0.3
+        radius = min(
+            self.width * 0.4,  # 宽度的40%
+            (self.height - self.height * legend_space_ratio) * 0.4  # 高度扣除图例空间后取40%
+        )
+
+        # 细分级别只在半径跨过阈值时变化，此时才重新生成单位扇形
+        level = pie_tessellation_level(radius)
+        if level != self.tessellation_level:
+            self.tessellation_level = level
+            self.unit_sectors = [unit_sector(start, start + angle, level)
+                                 for _, start, angle, _ in self.slices]
+            for (mesh, _, _, _), points in zip(self.slices, self.unit_sectors):
+                mesh.indices = list(range(len(points)))
+
+        for (mesh, start_angle, angle, label), points in zip(self.slices, self.unit_sectors):
+            vertices = []
+            for ux, uy in points:
+                vertices.extend((center_x + radius * ux, center_y + radius * uy, 0, 0))
+            mesh.vertices = vertices
+
+            # 标签放在扇形中间角度、距圆心 60% 半径处
+            mid_angle = start_angle + angle / 2
+            label_distance = radius * 0.6
+            label.size = (radius * 0.4, radius * 0.2)  # 按半径比例设宽高
+            label.center_x = center_x + label_distance * math.cos(math.radians(mid_angle))
+            label.center_y = center_y + label_distance * math.sin(math.radians(mid_angle))
+
+        # 图例位置（比例计算，替代固定像素）
+        legend_offset_ratio = 0.1  # 图例与扇形的间距比例（容器高度的10%）
+        legend_start_y = center_y - radius - (self.height * legend_offset_ratio)
+        legend_height_ratio = 0.03  # 每行图例高度比例（容器高度的5%）
+        legend_padding_ratio = 0.02  # 图例间距比例（容器高度的2%）
+        color_block_size = min(radius * 0.1, 20)  # 颜色块大小（按半径比例）
+        item_width = self.width * 0.6  # 图例项宽度比例（容器宽度的60%）
+        legend_x = self.center_x - item_width / 2  # 居中对齐
+
+        for i, (color_block, legend_label) in enumerate(self.legend_items):
+            legend_y = legend_start_y - i * (self.height * legend_height_ratio) - i * (self.height * legend_padding_ratio)
+            color_block.pos = (legend_x, legend_y + (self.height * legend_height_ratio - color_block_size) // 2)
+            color_block.size = (color_block_size, color_block_size)
+
             # 文字位置：颜色块右侧
+            label_width = item_width - color_block_size - 20
+            legend_label.size = (label_width, self.height * legend_height_ratio)
+            legend_label.text_size = (label_width, None)
             legend_label.x = legend_x + color_block_size + 10
             legend_label.y = legend_y
-            self.add_widget(legend_label)
+
+
+# ==================== 图表纹理缓存 ====================
+# 图表纹理缓存可占用的显存上限（字节），按 宽 × 高 × 4 估算每张纹理
+CHART_CACHE_BUDGET_BYTES = 16 * 1024 * 1024
+
+
+class ChartTextureCache:
+    """离屏渲染好的图表纹理，按 (图表类型, 筛选条件, 数据版本, 尺寸) 缓存，超出显存预算时淘汰最久未用的。
+    渲染用的 Fbo 不保留，GL 上下文丢失（安卓暂停后恢复）时纹理无法重建，由 App.on_resume 清空缓存"""
+
+    def __init__(self, budget_bytes: int = CHART_CACHE_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self._textures = OrderedDict()  # 键 -> (纹理, 字节数)
+
+    def get(self, key):
+        entry = self._textures.get(key)
+        if entry is None:
+            return None
+        self._textures.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, texture):
+        nbytes = texture.width * texture.height * 4
+        if nbytes > self.budget_bytes:
+            # 单张纹理就超出预算时不缓存
+            return
+        if key in self._textures:
+            self.used_bytes -= self._textures.pop(key)[1]
+        self._textures[key] = (texture, nbytes)
+        self.used_bytes += nbytes
+        while self.used_bytes > self.budget_bytes:
+            _, (_, evicted_bytes) = self._textures.popitem(last=False)
+            self.used_bytes -= evicted_bytes
+
+    def clear(self):
+        self._textures.clear()
+        self.used_bytes = 0
+
+
+# 全局图表纹理缓存（统计页和分析页共用）
+chart_texture_cache = ChartTextureCache()
+
+
+def render_chart_texture(chart, size):
+    """把图表控件离屏绘制到 Fbo 中，返回得到的纹理"""
+    # 离屏图表在这里同步绘制，不需要设置尺寸时排进下一帧的重绘
+    redraw_trigger = getattr(chart, "redraw_trigger", None)
+    if redraw_trigger is not None:
+        chart.unbind(size=redraw_trigger, pos=redraw_trigger)
+    chart.size = size
+    chart.pos = (0, 0)
+    chart.draw_chart()
+    # 标签的纹理默认在下一帧才生成，离屏绘制前先同步生成
+    for child in chart.children:
+        if isinstance(child, Label):
+            child.texture_update()
+
+    fbo = Fbo(size=size, with_stencilbuffer=True)
+    with fbo:
+        ClearColor(0, 0, 0, 0)
+        ClearBuffers()
+    fbo.add(chart.canvas)
+    fbo.draw()
+    fbo.remove(chart.canvas)
+    return fbo.texture
+
+
+class CachedChartView(Widget):
+    """显示缓存的图表纹理；缓存未命中时在统计线程池中计算数据，再创建图表控件并离屏绘制一次。
+    每次 set_chart 递增代号，代号过期的计算结果直接丢弃"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.chart_key = None  # 不含尺寸的缓存键：(图表类型, 筛选条件..., 数据版本)
+        self.compute = None  # 在后台线程中计算图表数据
+        self.build_chart = None  # 用计算好的数据创建图表控件（主线程）
+        self.chart_data = None  # 当前图表的数据（计算完成前为 None）
+        self.generation = 0  # 当前请求的代号
+        self.computing_generation = None  # 正在后台计算的请求代号
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            self.rect = Rectangle(size=(0, 0))
+        self.placeholder = Label(
+            text="正在统计...",
+            color=TEXT_COLOR,
+            halign="center",
+            valign="middle",
+            font_name=DEFAULT_FONT
+        )
+        self.placeholder.bind(height=update_all_font_size)
+        self.render_trigger = Clock.create_trigger(self.render)
+        self.bind(size=self.render_trigger, pos=self.render_trigger)
+
+    def set_chart(self, chart_key, compute, build_chart):
+        self.generation += 1
+        self.chart_key = chart_key
+        self.compute = compute
+        self.build_chart = build_chart
+        self.chart_data = None
+        self.render()
+
+    def render(self, *args):
+        if self.compute is None or self.width <= 1 or self.height <= 1:
+            return
+        size = (int(self.width), int(self.height))
+        key = self.chart_key + size
+        texture = chart_texture_cache.get(key)
+        if texture is None and self.chart_data is not None:
+            texture = render_chart_texture(self.build_chart(self.chart_data), size)
+            chart_texture_cache.put(key, texture)
+        if texture is None:
+            self.show_placeholder()
+            self.request_data()
+            return
+
+        if self.placeholder.parent is not None:
+            self.remove_widget(self.placeholder)
+        self.rect.texture = texture
+        self.rect.pos = self.pos
+        self.rect.size = size
+
+    def show_placeholder(self, text: str = "正在统计...", color=TEXT_COLOR):
+        """最新的数据计算完成之前显示占位提示（计算失败时显示错误信息）"""
+        self.placeholder.text = text
+        self.placeholder.color = color
+        self.rect.size = (0, 0)
+        if self.placeholder.parent is None:
+            self.add_widget(self.placeholder)
+        self.placeholder.pos = self.pos
+        self.placeholder.size = self.size
+
+    def request_data(self):
+        """把当前请求的数据计算交给统计线程池（同一请求只提交一次）"""
+        generation = self.generation
+        if self.computing_generation == generation:
+            return
+        self.computing_generation = generation
+
+        def on_done(future):
+            if generation != self.generation:
+                # 计算期间筛选条件或数据已变化，丢弃过期的结果
+                return
+            self.computing_generation = None
+            if future.error is None:
+                self.chart_data = future.result()
+                self.render()
+            else:
+                # 错误已由统计线程打印；不再显示"正在统计..."，下次刷新（再次点击或尺寸变化）时重新计算
+                self.show_placeholder("统计失败，请重试", ERROR_COLOR)
+
+        run_in_background(_compute_on_snapshot, self.compute).add_done_callback(on_done)
+
+
+def _compute_on_snapshot(compute):
+    """统计线程：只在取汇总表或列式索引的副本时持有仓库锁，计算期间主线程的保存/修改/删除不用等待统计。
+    json 引擎记录很多且 NumPy 可用时由统计函数自己取列式索引的副本，其余情况传入汇总表副本；
+    sqlite 和分片引擎的统计不读取仓库的索引（各自有锁），传入 None"""
+    if STORAGE_ENGINE != "json" or columnar_enabled(len(record_repository.records)):
+        return compute(None)
+    return compute(record_repository.rollups_snapshot())
+
+
+def load_saved_background_path():
+    """读取保存的背景图片路径（文件不存在时返回 None）"""
+    setting_file = os.path.join(os.path.dirname(DATA_FILE), "background_setting.json")
+
+    try:
+        if os.path.exists(setting_file):
+            with open(setting_file, 'r', encoding='utf-8') as f:
+                setting_data = json.load(f)
+                saved_path = setting_data.get('background_path')
+
+                # 检查保存的路径是否仍然存在
+                if saved_path and os.path.exists(saved_path):
+                    print(f"加载保存的背景路径: {saved_path}")  # 添加调试信息
+                    return saved_path
+                else:
+                    print(f"保存的背景文件不存在: {saved_path}")  # 添加调试信息
+                    return None
+    except Exception as e:
+        print(f"加载背景设置失败: {e}")
+
+    return None
 
 
 # 修改 ImagePage 类，添加内部图片选择功能
@@ -1768,8 +4537,9 @@ class ImagePage(BoxLayout):
         # 动态加载内置背景图片
         self.builtin_backgrounds = self.load_builtin_backgrounds()
 
-        # 加载保存的背景设置
-        self.saved_background = self.load_saved_background()
+        # 加载保存的背景设置（在 I/O 线程中读取，读完后回到主线程更新）
+        self.saved_background = None
+        io_worker.submit(self.load_saved_background).add_done_callback(self._on_saved_background_loaded)
 
         # 设置整体背景
         with self.canvas.before:
@@ -1831,37 +4601,28 @@ class ImagePage(BoxLayout):
             'timestamp': datetime.now().isoformat()
         }
 
-        # 使用与记账数据相同的存储路径
+        # 使用与记账数据相同的存储路径，在 I/O 线程中写入
         setting_file = os.path.join(os.path.dirname(DATA_FILE), "background_setting.json")
 
-        try:
+        def write_setting():
             with open(setting_file, 'w', encoding='utf-8') as f:
                 json.dump(setting_data, f, ensure_ascii=False, indent=2)
             print(f"背景设置已保存: {background_path}")  # 添加调试信息
-        except Exception as e:
-            print(f"保存背景设置失败: {e}")
+
+        def on_saved(future):
+            if future.error is not None:
+                print(f"保存背景设置失败: {future.error}")
+                self.preview_label.text = f"背景已应用，但保存设置失败: {future.error}"
+
+        io_worker.submit(write_setting).add_done_callback(on_saved)
 
     def load_saved_background(self):
         """加载保存的背景设置"""
-        setting_file = os.path.join(os.path.dirname(DATA_FILE), "background_setting.json")
-
-        try:
-            if os.path.exists(setting_file):
-                with open(setting_file, 'r', encoding='utf-8') as f:
-                    setting_data = json.load(f)
-                    saved_path = setting_data.get('background_path')
-
-                    # 检查保存的路径是否仍然存在
-                    if saved_path and os.path.exists(saved_path):
-                        print(f"加载保存的背景路径: {saved_path}")  # 添加调试信息
-                        return saved_path
-                    else:
-                        print(f"保存的背景文件不存在: {saved_path}")  # 添加调试信息
-                        return None
-        except Exception as e:
-            print(f"加载背景设置失败: {e}")
+        return load_saved_background_path()
 
-        return None
+    def _on_saved_background_loaded(self, future):
+        if future.error is None:
+            self.saved_background = future.result()
 
     def apply_saved_background(self):
         """应用保存的背景设置"""
@@ -2086,6 +4847,8 @@ class ImagePage(BoxLayout):
 
     def select_new_background(self, instance):
         """选择新背景图片"""
+        from kivy.uix.popup import Popup
+        from kivy.uix.filechooser import FileChooserIconView  # 文件选择器较重，用到时才导入
         # 首先检查权限
         if 'android' in sys.modules:
             from android.permissions import check_permission, Permission
@@ -2207,6 +4970,8 @@ class ImagePage(BoxLayout):
 
     def select_internal_background(self, instance):
         """选择内部背景图片（从backgrounds文件夹）"""
+        from kivy.uix.popup import Popup
+        from kivy.uix.filechooser import FileChooserIconView
         try:
             # 检查backgrounds文件夹是否存在
             if not os.path.exists(self.backgrounds_folder):
@@ -2283,6 +5048,9 @@ class ImagePage(BoxLayout):
 # 主应用类
 class AdvancedAccountBookApp(App):
     def build(self):
+        build_started = time.perf_counter()
+        # 创建第一个文字控件之前注册中文字体
+        register_chinese_font()
         self.title = "高级记账本"
 
         # 主布局
@@ -2291,13 +5059,14 @@ class AdvancedAccountBookApp(App):
         # 创建Tab面板
         tab_panel = TabbedPanel(do_default_tab=False)
 
-        # 创建页面
+        # 启动时只创建记账页，其他页面第一次切换过去时再创建
         self.input_page = InputPage(parent_app=self)
-        self.search_page = SearchPage(parent_app=self)
-        self.records_page = RecordsPage(parent_app=self)
-        self.statistics_page = StatisticsPage(parent_app=self)
-        self.analysis_page = AnalysisPage(parent_app=self)
-        self.image_page = ImagePage(parent_app=self)
+        self.search_page = None
+        self.records_page = None
+        self.statistics_page = None
+        self.analysis_page = None
+        self.image_page = None
+        self.current_background = None  # 当前背景：("color", 颜色) 或 ("image", 图片路径)
 
         def update_font_size(instance, value):
             """通用字体大小调整函数 - 根据组件长宽的最小值缩放"""
@@ -2319,13 +5088,18 @@ class AdvancedAccountBookApp(App):
         image_tab = TabbedPanelItem(text='图片')  # 新增图片Tab
         image_tab.bind(size=update_font_size)
 
-        # 将页面添加到对应Tab
+        # 记账页直接放入Tab，其余页面记录创建方式：Tab -> (属性名, 页面类)
         input_tab.content = self.input_page
-        search_tab.content = self.search_page
-        records_tab.content = self.records_page
-        statistics_tab.content = self.statistics_page
-        analysis_tab.content = self.analysis_page
-        image_tab.content = self.image_page  # 新增图片页面内容
+        self.lazy_tabs = {
+            search_tab: ("search_page", SearchPage),
+            records_tab: ("records_page", RecordsPage),
+            statistics_tab: ("statistics_page", StatisticsPage),
+            analysis_tab: ("analysis_page", AnalysisPage),
+            image_tab: ("image_page", ImagePage),
+        }
+        for tab in self.lazy_tabs:
+            # 按下Tab时（切换之前）创建页面，切换时即可直接显示
+            tab.bind(on_press=self.ensure_tab_content)
 
         # 添加Tab到面板
         tab_panel.add_widget(input_tab)
@@ -2338,79 +5112,129 @@ class AdvancedAccountBookApp(App):
         # 设置默认选中的Tab
         tab_panel.default_tab = input_tab
 
+        # 依赖记录数据的页面（创建后加入）：数据变化时只标记为待刷新，切换到该页时再刷新
+        self.tab_panel = tab_panel
+        self.data_page_tabs = {}
+        self.dirty_pages = set()
+        tab_panel.bind(current_tab=self.on_tab_switch)
+        record_repository.add_listener(self.on_records_changed)
+
         # 将Tab面板添加到主布局
         main_layout.add_widget(tab_panel)
 
         # 应用保存的背景设置
         Clock.schedule_once(self.apply_saved_background_settings, 0.1)
+        # 在 I/O 线程中提前加载记录，打开记录/搜索页时不必等待磁盘
+        record_repository.preload()
+
+        # 启动耗时报告：第一次画面交换（首帧显示）时打印
+        self.build_seconds = time.perf_counter() - build_started
+        Window.bind(on_flip=self.report_startup_time)
+        if PROFILING_ENABLED:
+            Clock.schedule_once(lambda dt: profiler.start(self.root))
 
         return main_layout
 
+    def report_startup_time(self, *args):
+        """打印启动耗时（只在首帧执行一次）"""
+        Window.unbind(on_flip=self.report_startup_time)
+        first_frame = time.perf_counter() - STARTUP_STARTED
+        print(f"[启动] 构建界面 {self.build_seconds * 1000:.0f} ms，首帧 {first_frame * 1000:.0f} ms")
+
+    def ensure_tab_content(self, tab):
+        """第一次打开某个Tab时创建对应的页面"""
+        if tab.content is not None or tab not in self.lazy_tabs:
+            return tab.content
+
+        started = time.perf_counter()
+        name, page_class = self.lazy_tabs[tab]
+        page = page_class(parent_app=self)
+        setattr(self, name, page)
+        tab.content = page
+        if page_class is not ImagePage:
+            self.data_page_tabs[page] = tab
+
+        # 新页面沿用当前背景
+        if self.current_background is not None:
+            kind, value = self.current_background
+            if kind == "image":
+                self._set_page_background_image(page, value)
+            else:
+                self._set_page_background_color(page, value)
+        print(f"[启动] 创建页面 {tab.text} {(time.perf_counter() - started) * 1000:.0f} ms")
+        return page
+
+    def on_pause(self):
+        """切到后台时保存汇总表（安卓可能随后直接结束进程）"""
+        record_repository.flush()
+        return True
+
+    def on_resume(self):
+        """回到前台：暂停期间 GL 上下文可能已重建，缓存的图表纹理会变成空白，清空缓存并重绘已显示的图表"""
+        chart_texture_cache.clear()
+        for page in (self.statistics_page, self.analysis_page):
+            if page is not None:
+                page.chart_view.render()
+
+    def on_stop(self):
+        record_repository.flush()
+        if PROFILING_ENABLED:
+            profiler.dump_trace()
+
     def apply_saved_background_settings(self, dt):
-        """应用保存的背景设置"""
-        if hasattr(self.image_page, 'apply_saved_background'):
+        """应用保存的背景设置（图片页尚未创建时在 I/O 线程中读取设置文件）"""
+        if self.image_page is not None:
             self.image_page.apply_saved_background()
+            return
 
-    def refresh_all_pages(self):
-        """刷新所有页面的数据"""
-        # 重新加载记录
-        records = load_records()
+        def apply(future):
+            if future.error is None and future.result():
+                self.set_page_backgrounds_to_image(future.result())
 
-        # 更新各个页面的数据
-        self.input_page.current_records = records
-        self.search_page.current_records = records
-        self.records_page.current_records = records
-        self.statistics_page.current_records = records
-        self.analysis_page.current_records = records
+        io_worker.submit(load_saved_background_path).add_done_callback(apply)
 
-        # 刷新各个页面的显示
-        self.records_page.refresh_records(records)
+    def is_page_visible(self, page):
+        """页面所在的Tab是否为当前选中的Tab"""
+        return self.data_page_tabs.get(page) is self.tab_panel.current_tab
 
-        # 更新搜索页面的记录显示
-        self.search_page.refresh_search_records(self.search_page.current_records)
+    @profiled()
+    def on_records_changed(self, op, record):
+        """记录仓库的变化通知：可见页面增量更新，其余页面标记为待刷新"""
+        if op == "partial":
+            # 流式加载的中间结果只刷新可见的记录页，其他页面等加载完成（"reload"）时再刷新
+            if self.records_page is not None and self.is_page_visible(self.records_page):
+                self.records_page.refresh_page()
+            return
+        for page in self.data_page_tabs:
+            if self.is_page_visible(page):
+                page.apply_records_change(op, record)
+            else:
+                self.dirty_pages.add(page)
 
-        # 刷新统计页面数据
-        self.statistics_page.current_records = records
-        # 刷新分析页面数据
-        self.analysis_page.current_records = records
-        self.analysis_page.show_analysis()
+    @profiled()
+    def on_tab_switch(self, tab_panel, tab):
+        """切换到待刷新的页面时才刷新它"""
+        page = self.ensure_tab_content(tab)
+        if page in self.dirty_pages:
+            self.dirty_pages.discard(page)
+            page.refresh_page()
 
     def set_page_backgrounds_to_color(self, color):
-        """将第1、2、3、4、5页背景设置为指定颜色"""
-        pages = [
-            self.input_page,
-            self.search_page,
-            self.records_page,
-            self.statistics_page,
-            self.analysis_page
-        ]
-
-        for page in pages:
-            if hasattr(page, 'canvas'):
-                with page.canvas.before:
-                    Color(*color)
-                    page.rect = Rectangle(size=page.size, pos=page.pos)
-                    page.bind(size=page._update_rect, pos=page._update_rect)
+        """将第1、2、3、4、5页背景设置为指定颜色（尚未创建的页面在创建时应用）"""
+        self.current_background = ("color", color)
+        for page in self._background_pages():
+            self._set_page_background_color(page, color)
 
     def set_page_backgrounds_to_image(self, image_path):
-        """将第1、2、3、4、5页背景设置为指定图片"""
-        pages = [
-            self.input_page,
-            self.search_page,
-            self.records_page,
-            self.statistics_page,
-            self.analysis_page
-        ]
+        """将第1、2、3、4、5页背景设置为指定图片（尚未创建的页面在创建时应用）"""
+        self.current_background = ("image", image_path)
+        for page in self._background_pages():
+            self._set_page_background_image(page, image_path)
 
-        for page in pages:
-            if hasattr(page, 'canvas'):
-                with page.canvas.before:
-                    Color(1, 1, 1, 1)  # 白色背景以显示图片
-                    page.rect = Rectangle(size=page.size, pos=page.pos, source=image_path)
-                    page.bind(size=page._update_rect, pos=page._update_rect)
+        # 保存到应用实例，以便重启后使用
+        self.current_background_image = image_path
 
-    def set_page_backgrounds_to_image(self, image_path):
-        """将第1、2、3、4、5页背景设置为指定图片"""
+    def _background_pages(self):
         pages = [
             self.input_page,
             self.search_page,
@@ -2418,16 +5242,21 @@ class AdvancedAccountBookApp(App):
             self.statistics_page,
             self.analysis_page
         ]
+        return [page for page in pages if page is not None]
 
-        for page in pages:
-            if hasattr(page, 'canvas'):
-                with page.canvas.before:
-                    Color(1, 1, 1, 1)  # 白色背景以显示图片
-                    page.rect = Rectangle(size=page.size, pos=page.pos, source=image_path)
-                    page.bind(size=page._update_rect, pos=page._update_rect)
-
-        # 保存到应用实例，以便重启后使用
-        self.current_background_image = image_path
+    @staticmethod
+    def _set_page_background_color(page, color):
+        with page.canvas.before:
+            Color(*color)
+            page.rect = Rectangle(size=page.size, pos=page.pos)
+            page.bind(size=page._update_rect, pos=page._update_rect)
+
+    @staticmethod
+    def _set_page_background_image(page, image_path):
+        with page.canvas.before:
+            Color(1, 1, 1, 1)  # 白色背景以显示图片
+            page.rect = Rectangle(size=page.size, pos=page.pos, source=image_path)
+            page.bind(size=page._update_rect, pos=page._update_rect)
 
 
 def update_all_font_size(instance, value):
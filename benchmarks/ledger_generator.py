@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# ledger_generator.py - 生成合成账本数据（基准测试用）
+# 同一个 seed 和条数总是生成完全相同的记录，不同机器上的测试结果可以对比
+#
+# 单独使用：python benchmarks/ledger_generator.py 100000 ledger.json
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import List, Dict
+
+# 与 account_book.EXPENSE_CATEGORIES 一致（这里不导入 account_book，生成数据不需要 Kivy）
+EXPENSE_CATEGORIES = ["购物", "吃饭", "房租", "交通", "礼物"]
+
+# 各分类常见的备注和金额范围（单位：分）
+CATEGORY_PROFILES = {
+    "购物": (["超市", "淘宝", "京东日用品", "衣服", "水果", "便利店", "拼多多", "洗发水", ""], 500, 80000),
+    "吃饭": (["早餐", "午饭", "晚饭", "麦当劳", "肯德基", "外卖", "奶茶", "火锅", "食堂", "咖啡", ""], 300, 30000),
+    "房租": (["房租", "物业费", "水电费", "燃气费", "宽带"], 5000, 500000),
+    "交通": (["地铁", "公交", "打车", "滴滴", "加油", "停车费", "高铁票", "共享单车", ""], 150, 60000),
+    "礼物": (["生日礼物", "红包", "鲜花", "结婚份子钱", "给妈妈买的围巾", "节日礼物"], 2000, 200000),
+}
+# 各分类的记录占比（吃饭、交通最频繁，房租每月几次）
+CATEGORY_WEIGHTS = [20, 45, 3, 27, 5]
+
+
+def generate_ledger(count: int, seed: int = 2024, years: int = 5, end: datetime = None) -> List[Dict]:
+    """生成 count 条按时间先后排列的记录（与数据文件中的记录格式相同），时间均匀分布在最近 years 年内"""
+    rng = random.Random(seed)
+    if end is None:
+        end = datetime.now().replace(second=0, microsecond=0)
+    span_minutes = years * 365 * 24 * 60
+
+    offsets = sorted(rng.randrange(span_minutes) for _ in range(count))
+    categories = rng.choices(EXPENSE_CATEGORIES, weights=CATEGORY_WEIGHTS, k=count)
+    start = end - timedelta(minutes=span_minutes)
+
+    records = []
+    for offset, category in zip(offsets, categories):
+        remarks, low, high = CATEGORY_PROFILES[category]
+        t = start + timedelta(minutes=offset)
+        records.append({
+            "time": t.strftime("%Y-%m-%d %H:%M"),
+            "date": t.strftime("%Y-%m-%d"),
+            "month": t.strftime("%Y-%m"),
+            "year": t.strftime("%Y"),
+            "category": category,
+            "remark": rng.choice(remarks),
+            "cents": rng.randint(low, high)
+        })
+    return records
+
+
+def write_ledger(path: str, records: List[Dict]):
+    """按第 1 版数据文件格式写出记录（UTF-8、保留中文、indent=2，金额为浮点元 amount），应用第一次加载时会改写为当前格式"""
+    rows = [{"time": record["time"], "date": record["date"], "month": record["month"], "year": record["year"],
+             "category": record["category"], "remark": record["remark"], "amount": record["cents"] / 100}
+            for record in records]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("用法: python benchmarks/ledger_generator.py <条数> <输出文件>")
+        sys.exit(2)
+    write_ledger(sys.argv[2], generate_ledger(int(sys.argv[1])))
+    print(f"已生成 {sys.argv[1]} 条记录: {sys.argv[2]}")
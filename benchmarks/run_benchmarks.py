@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+# run_benchmarks.py - 记账本热点函数的基准测试（无界面运行）
+# 用合成账本（见 ledger_generator.py）在临时目录中测量加载、保存、删除、筛选、搜索和统计的耗时，
+# 结果写成 JSON，并与保存的基线对比，变慢超过阈值时列出并以退出码 1 结束
+#
+# 用法：
+#   python benchmarks/run_benchmarks.py                          # 1k/10k/100k/1M 全部规模
+#   python benchmarks/run_benchmarks.py --sizes 1000 10000       # 只测部分规模
+#   python benchmarks/run_benchmarks.py --save-baseline          # 把本次结果保存为基线
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# 无显示环境下运行：不解析命令行、不写 Kivy 日志，SDL 使用虚拟显示驱动（不会弹出窗口）；
+# 窗口固定用 sdl2，否则 SDL 窗口创建失败后 Kivy 会改用 x11，没有 X 服务器时直接退出
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+os.environ.setdefault("KIVY_NO_FILELOG", "1")
+os.environ.setdefault("KIVY_WINDOW", "sdl2")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+import account_book as ab  # noqa: E402
+from kivy.clock import Clock  # noqa: E402
+from ledger_generator import generate_ledger, write_ledger  # noqa: E402
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+DEFAULT_RESULTS_FILE = os.path.join(BENCHMARK_DIR, "results.json")
+DEFAULT_BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baseline.json")
+# 比基线慢超过该比例才算退化；差值小于 MIN_DELTA_MS 的视为计时噪声
+DEFAULT_THRESHOLD = 0.25
+MIN_DELTA_MS = 0.1
+
+
+def measure(func, repeat: int, warmup: int = 1):
+    """执行 warmup 次预热后计时 repeat 次，返回中位数/最小/最大耗时（毫秒）"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "runs": repeat,
+        "median_ms": round(statistics.median(samples), 4),
+        "min_ms": round(min(samples), 4),
+        "max_ms": round(max(samples), 4)
+    }
+
+
+def drain_callbacks():
+    """等待 I/O 线程空闲并执行排队的主线程回调（写盘完成的通知）"""
+    ab.io_worker.wait_idle()
+    Clock.tick()
+
+
+def saved_and_written():
+    """保存一条记录并等待写盘完成"""
+    ab.save_record("吃饭", "基准测试", 12.5)
+    ab.io_worker.wait_idle()
+
+
+def updated_and_written():
+    """修改最早的一条记录（按 id）并等待写盘完成"""
+    record = ab.record_repository.records[0]
+    ab.update_record(record["id"], record["category"], "基准测试", 12.5)
+    ab.io_worker.wait_idle()
+
+
+def deleted_and_written():
+    """删除最后一条记录（按 id）并等待写盘完成"""
+    ab.delete_record(ab.record_repository.records[-1]["id"])
+    ab.io_worker.wait_idle()
+
+
+def query_benchmarks(records):
+    """查询类基准：records 为记录列表（传列表的调用方式）或 None（页面使用的仓库索引/汇总表）"""
+    return [
+        ("filter_records_by_time", lambda: ab.filter_records_by_time(records, "本年")),
+        ("search_records", lambda: ab.search_records(records, "超市")),
+        ("get_monthly_statistics", lambda: ab.get_monthly_statistics(records, "总和")),
+        ("get_daily_statistics", lambda: ab.get_daily_statistics(records, "总和")),
+        ("get_yearly_statistics", lambda: ab.get_yearly_statistics(records, "吃饭")),
+        ("calculate_category_distribution",
+         lambda: ab.calculate_category_distribution(records if records is not None
+                                                    else ab.record_repository.records)),
+    ]
+
+
+def run_size(size: int, repeat: int, seed: int):
+    """在临时目录中用 size 条合成记录跑一遍全部基准，返回 {名称@条数: 结果}"""
+    results = {}
+
+    def record(name, result):
+        key = f"{name}@{size}"
+        results[key] = result
+        print(f"  {key:<52} 中位数 {result['median_ms']:>10.3f} ms")
+
+    with tempfile.TemporaryDirectory(prefix="account_book_bench_") as workdir:
+        ab.DATA_FILE = os.path.join(workdir, "advanced_account_records.json")
+        ab.record_repository = ab.RecordRepository()
+        write_ledger(ab.DATA_FILE, generate_ledger(size, seed=seed))
+
+        # 加载：每次都从磁盘完整读取（JSON 引擎下为快照 + 日志）
+        record("load_records", measure(ab.load_records, repeat))
+
+        records = ab.record_repository.records
+        for name, func in query_benchmarks(records):
+            record(name, measure(func, repeat))
+        # 页面实际使用的方式（records=None），首次调用构建索引的耗时不计入
+        for name, func in query_benchmarks(None):
+            record(f"{name}[repository]", measure(func, repeat))
+
+        # 写入类放在最后，查询测的都是原始账本
+        record("save_record", measure(saved_and_written, repeat))
+        drain_callbacks()
+        record("update_record", measure(updated_and_written, repeat))
+        drain_callbacks()
+        record("delete_record", measure(deleted_and_written, repeat))
+        drain_callbacks()
+        ab.record_repository.flush()
+    return results
+
+
+def compare_with_baseline(results, baseline, threshold: float):
+    """与基线逐项对比，打印变化并返回退化的项目名"""
+    regressions = []
+    print(f"\n与基线对比（阈值 +{threshold:.0%}）：")
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"  {key:<52} 基线中没有该项")
+            continue
+        current_ms, base_ms = result["median_ms"], base["median_ms"]
+        change = (current_ms - base_ms) / base_ms if base_ms > 0 else 0.0
+        regressed = change > threshold and current_ms - base_ms > MIN_DELTA_MS
+        if regressed:
+            regressions.append(key)
+        print(f"  {key:<52} {base_ms:>10.3f} -> {current_ms:>10.3f} ms ({change:+.1%})"
+              f"{'  <-- 退化' if regressed else ''}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="记账本热点函数基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="账本规模（记录条数）")
+    parser.add_argument("--repeat", type=int, default=5, help="每项计时次数（取中位数）")
+    parser.add_argument("--seed", type=int, default=2024, help="合成账本的随机种子")
+    parser.add_argument("--engine", choices=["json", "sqlite", "sharded"], default=ab.STORAGE_ENGINE, help="存储引擎")
+    parser.add_argument("--layout", choices=["compact", "dict"], default=ab.RECORD_LAYOUT, help="内存中的记录布局")
+    parser.add_argument("--output", default=DEFAULT_RESULTS_FILE, help="结果 JSON 文件")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_FILE, help="基线 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="判定退化的变慢比例")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    args = parser.parse_args(argv)
+
+    ab.STORAGE_ENGINE = args.engine
+    ab.RECORD_LAYOUT = args.layout
+
+    results = {}
+    for size in args.sizes:
+        print(f"{size} 条记录：")
+        results.update(run_size(size, args.repeat, args.seed))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": ab.load_numpy().__version__ if ab.load_numpy() is not None else None,
+            "engine": args.engine,
+            "layout": args.layout,
+            "repeat": args.repeat,
+            "seed": args.seed
+        },
+        "results": results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存到 {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"没有基线文件 {args.baseline}，跳过对比（用 --save-baseline 保存）")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get("meta", {}).get("engine") != args.engine or baseline.get("meta", {}).get("layout") != args.layout:
+        print("注意：基线的存储引擎或记录布局与本次不同，对比结果仅供参考")
+    regressions = compare_with_baseline(results, baseline.get("results", {}), args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} 项比基线慢：{', '.join(regressions)}")
+        return 1
+    print("\n没有发现退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# storage_format_report.py - 比较两种数据文件格式的文件大小和读写耗时（无界面运行）
+# 第 1 版：indent=2 的 JSON 数组，每次保存改写整个文件；当前版本：紧凑格式 + 日志（见 account_book.DATA_FORMAT_VERSION）
+#
+# 用法：python benchmarks/storage_format_report.py [--sizes 10000 100000] [--saves 500]
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from run_benchmarks import ab  # 导入时已设置无界面运行的环境变量
+from ledger_generator import generate_ledger, write_ledger
+
+
+def _timed(func) -> float:
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) * 1000
+
+
+def _read_ms(path: str) -> float:
+    """读取到可用的内存记录为止（第 1 版读出的字典还要转换成紧凑记录）"""
+    return _timed(lambda: [ab.pack_record(record) for record in ab.read_records_file(path)])
+
+
+def measure_v1(records, workdir: str):
+    """第 1 版：写快照、读快照；保存一条记录要改写整个文件"""
+    path = os.path.join(workdir, "v1.json")
+    write_ms = _timed(lambda: write_ledger(path, records))
+    file_bytes = os.path.getsize(path)
+    return {
+        "file_bytes": file_bytes,
+        "write_ms": write_ms,
+        "read_ms": _read_ms(path),
+        "bytes_per_save": file_bytes,
+        "save_ms": write_ms
+    }
+
+
+def measure_current(records, saves: int, workdir: str):
+    """当前格式：写快照、读快照并逐条追加日志"""
+    ab.DATA_FILE = os.path.join(workdir, f"v{ab.DATA_FORMAT_VERSION}.json")
+    write_ms = _timed(lambda: ab.write_records_file(ab.DATA_FILE, records))
+
+    # 保存一条记录的写盘部分：向日志追加一行
+    latencies = [_timed(lambda: ab._persist_record(record)) for record in records[:saves]]
+    return {
+        "file_bytes": os.path.getsize(ab.DATA_FILE),
+        "write_ms": write_ms,
+        "read_ms": _read_ms(ab.DATA_FILE),
+        "bytes_per_save": os.path.getsize(ab.get_journal_file_path()) / saves,
+        "save_ms": statistics.median(latencies)
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="数据文件格式对比")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="账本规模（记录条数）")
+    parser.add_argument("--saves", type=int, default=500, help="测量保存耗时的次数")
+    args = parser.parse_args(argv)
+
+    ab.STORAGE_ENGINE = "json"
+    for size in args.sizes:
+        records = [ab.pack_record(record) for record in generate_ledger(size)]
+        ab.assign_record_ids(records)
+        with tempfile.TemporaryDirectory(prefix="account_book_format_") as workdir:
+            old = measure_v1(records, workdir)
+            new = measure_current(records, min(args.saves, size), workdir)
+        print(f"{size} 条记录：")
+        print(f"  快照大小   {old['file_bytes'] / 1024:>10.0f} KB -> {new['file_bytes'] / 1024:>10.0f} KB"
+              f"（{new['file_bytes'] / old['file_bytes']:.0%}）")
+        print(f"  写快照     {old['write_ms']:>10.1f} ms -> {new['write_ms']:>10.1f} ms")
+        print(f"  读快照     {old['read_ms']:>10.1f} ms -> {new['read_ms']:>10.1f} ms")
+        print(f"  每次保存   {old['bytes_per_save']:>10.0f} B  -> {new['bytes_per_save']:>10.0f} B，"
+              f"中位数 {old['save_ms']:.3f} ms -> {new['save_ms']:.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
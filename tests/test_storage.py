@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# test_storage.py - 存储引擎、日志重放、汇总表和写盘回滚的测试（无界面运行）
+#
+# 用法：python -m pytest -q tests
+import os
+import sys
+from datetime import datetime
+
+# 与 benchmarks/run_benchmarks.py 相同：不解析命令行、不写 Kivy 日志，SDL 使用虚拟显示驱动
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+os.environ.setdefault("KIVY_NO_FILELOG", "1")
+os.environ.setdefault("KIVY_WINDOW", "sdl2")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "benchmarks"))
+
+import pytest  # noqa: E402
+import account_book as ab  # noqa: E402
+from kivy.clock import Clock  # noqa: E402
+from ledger_generator import generate_ledger, write_ledger  # noqa: E402
+
+ENGINES = ["json", "sqlite", "sharded"]
+# 所有测试使用同一个“现在”，不同引擎中新保存的记录时间完全相同
+FIXED_NOW = datetime(2026, 3, 15, 12, 30)
+
+
+class FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(FIXED_NOW.year, FIXED_NOW.month, FIXED_NOW.day, FIXED_NOW.hour, FIXED_NOW.minute)
+
+
+def _close_sqlite():
+    if ab._sqlite_conn is not None:
+        ab._sqlite_conn.close()
+    ab._sqlite_conn = ab._sqlite_conn_path = None
+
+
+def restart():
+    """模拟重启应用：等写盘完成并处理回调，再丢弃所有进程内状态"""
+    ab.io_worker.wait_idle()
+    Clock.tick()
+    _close_sqlite()
+    ab._json_next_id = 1
+    ab.shard_store = ab.ShardStore()
+    ab.record_repository = ab.RecordRepository()
+
+
+def records():
+    return [dict(record) for record in ab.record_repository.records]
+
+
+@pytest.fixture
+def ledger_dir(tmp_path, monkeypatch):
+    """每个测试使用独立的数据目录和全新的仓库，结束后恢复原设置"""
+    monkeypatch.setattr(ab, "datetime", FixedDatetime)
+    monkeypatch.setattr(ab, "DATA_FILE", str(tmp_path / "advanced_account_records.json"))
+    monkeypatch.setattr(ab, "STORAGE_ENGINE", "json")
+    restart()
+    yield tmp_path
+    restart()
+
+
+def use_engine(engine: str, ledger_size: int = 300):
+    """切换引擎，并写入第 1 版格式的合成账本（首次加载时由各引擎迁移）"""
+    ab.STORAGE_ENGINE = engine
+    write_ledger(ab.DATA_FILE, generate_ledger(ledger_size, end=FIXED_NOW))
+    restart()
+
+
+def edit_ledger():
+    """新增、修改、删除各做几次，返回被删除的最新记录的 id"""
+    assert ab.save_record("吃饭", "午饭", "12.5")
+    assert ab.save_record("交通", "", 3)
+    assert ab.save_record("礼物", "鲜花", "88.80")
+    current = ab.record_repository.records
+    assert ab.update_record(current[0]["id"], "购物", "改过的备注", "0.01")
+    assert ab.update_record(current[-2]["id"], "房租", "", "1500")
+    assert ab.delete_record(current[10]["id"])
+    newest_id = current[-1]["id"]
+    assert ab.delete_record(newest_id)
+    return newest_id
+
+
+def test_engines_agree_after_save_edit_delete_and_reload(ledger_dir):
+    results = {}
+    for engine in ENGINES:
+        ab.DATA_FILE = str(ledger_dir / engine / "advanced_account_records.json")
+        os.makedirs(os.path.dirname(ab.DATA_FILE))
+        use_engine(engine)
+        edit_ledger()
+        in_memory = records()
+        restart()
+        assert records() == in_memory, engine
+        results[engine] = in_memory
+
+    assert len(results["json"]) == 300 + 3 - 2
+    assert results["sqlite"] == results["json"]
+    assert results["sharded"] == results["json"]
+
+
+def test_v1_file_is_migrated_to_cents_and_ids(ledger_dir):
+    source = generate_ledger(50, end=FIXED_NOW)
+    use_engine("json", 50)
+    loaded = records()
+    assert [record["id"] for record in loaded] == list(range(1, 51))
+    assert [record["cents"] for record in loaded] == [record["cents"] for record in source]
+    assert ab.records_file_version(ab.DATA_FILE) == ab.DATA_FORMAT_VERSION
+
+
+def test_journal_replay_matches_memory(ledger_dir):
+    use_engine("json")
+    records()  # 首次加载把第 1 版文件改写为当前格式
+    snapshot_size = os.path.getsize(ab.DATA_FILE)
+    edit_ledger()
+    in_memory = records()
+    restart()
+
+    # 保存/修改/删除只追加日志，快照文件不变
+    assert os.path.getsize(ab.DATA_FILE) == snapshot_size
+    ops = [entry["op"] for entry in ab._read_journal()]
+    assert ops == ["add"] * 3 + ["update"] * 2 + ["del"] * 2
+    assert records() == in_memory
+
+    # 合并日志后读到的记录也相同
+    assert ab.compact_records()
+    assert not os.path.exists(ab.get_journal_file_path())
+    restart()
+    assert records() == in_memory
+
+
+def test_truncated_journal_line_is_skipped(ledger_dir):
+    use_engine("json", 10)
+    assert ab.save_record("吃饭", "", 1)
+    in_memory = records()
+    restart()
+    with open(ab.get_journal_file_path(), 'a', encoding='utf-8') as f:
+        f.write('["+", [99, 1')  # 写入中途断电留下的半行
+    restart()
+    assert records() == in_memory
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_rollups_match_full_scan(ledger_dir, engine):
+    use_engine(engine)
+    assert ab.record_repository.rollups == ab.RollupTables.from_records(ab.record_repository.records)
+    edit_ledger()
+    assert ab.record_repository.rollups == ab.RollupTables.from_records(ab.record_repository.records)
+
+    # 写到数据文件旁边的汇总表在重启后读回，仍与全量重建一致
+    ab.record_repository.flush()
+    restart()
+    assert ab.record_repository.rollups == ab.RollupTables.from_records(ab.record_repository.records)
+    assert ab.record_repository.rebuild_rollups()
+
+
+def test_statistics_match_full_scan(ledger_dir, monkeypatch):
+    use_engine("json", 3000)
+    edit_ledger()
+    plain = list(ab.record_repository.records)  # 不是仓库中的列表：不使用汇总表和常驻索引
+    stats_functions = (ab.get_monthly_statistics, ab.get_daily_statistics, ab.get_yearly_statistics)
+    with monkeypatch.context() as patch:
+        patch.setattr(ab, "COLUMNAR_MIN_RECORDS", 10 ** 9)  # 纯 Python 全量扫描
+        expected = {(stats, category): stats(plain, category)
+                    for stats in stats_functions for category in ["总和", "吃饭"]}
+
+    for (stats, category), result in expected.items():
+        assert stats(plain, category) == result  # 列式引擎（NumPy 可用时）
+        assert stats(None, category) == result  # 仓库的列式索引副本或汇总表
+        assert stats(None, category, ab.record_repository.rollups_snapshot()) == result
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_failed_write_rolls_back_to_disk(ledger_dir, monkeypatch, engine):
+    use_engine(engine, 20)
+    before = records()
+
+    persist = ab._persist_record
+    failures = []
+
+    def disk_full(record):
+        raise IOError("disk full")
+
+    monkeypatch.setattr(ab, "_persist_record", disk_full)
+    assert ab.save_record("吃饭", "失败1", 1, on_error=failures.append)
+    assert ab.save_record("吃饭", "失败2", 2, on_error=failures.append)
+    assert len(records()) == len(before) + 2  # 写盘之前界面已经看到新记录
+    ab.io_worker.wait_idle()
+    Clock.tick()
+
+    # 两次写入都报告失败（第二次因为前一次失败而被跳过），缓存回滚到磁盘上的内容
+    assert len(failures) == 2
+    assert not ab.record_repository._write_failed
+    assert records() == before
+    assert ab.calculate_total_by_time(None, "") == sum(record["cents"] for record in before)
+
+    # 恢复后可以正常保存
+    monkeypatch.setattr(ab, "_persist_record", persist)
+    assert ab.save_record("吃饭", "成功", 3)
+    restart()
+    assert [record["remark"] for record in records()[len(before):]] == ["成功"]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("compact", [False, True])
+def test_deleted_newest_id_is_not_reused(ledger_dir, engine, compact):
+    use_engine(engine, 20)
+    deleted_id = edit_ledger()
+    restart()
+    if compact and engine == "json":
+        assert ab.compact_records()
+        restart()
+    assert deleted_id > max(record["id"] for record in records())
+
+    assert ab.save_record("吃饭", "", 1)
+    assert records()[-1]["id"] == deleted_id + 1
+    restart()
+    assert records()[-1]["id"] == deleted_id + 1